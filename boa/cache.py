@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import tempfile
+from boa import __version__
+
+
+class CompileCache(object):
+    """
+    A content addressed, on-disk cache of compiled contracts.
+
+    Entries are keyed by a hash of the compiler version, the compile options and the contents
+    of the entry file. Each entry records the contents hash of every file imported while
+    compiling, so a change to any file in the import closure is a cache miss.
+
+    Once the files in the cache directory grow above ``max_size`` bytes, the least
+    recently used files are removed.
+
+    .. code-block:: python
+
+        from boa.cache import CompileCache
+        from boa.compiler import Compiler
+
+        Compiler.load_and_save('path/to/your/file.py', cache=CompileCache())
+    """
+
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.neo-boa', 'cache')
+
+    DEFAULT_MAX_SIZE = 128 * 1024 * 1024
+
+    directory = None
+
+    max_size = None
+
+    hits = 0
+
+    misses = 0
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory if directory is not None else CompileCache.DEFAULT_DIRECTORY
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path):
+        """
+        Hash the contents of a file.
+
+        :param path: the path of the file to hash
+        :return: the hex digest of the file contents, or ``None`` if the file could not be read
+        """
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    @staticmethod
+    def entry_key(path, options, file_hash=None):
+        """
+        Compute the key of the manifest for an entry file.
+
+        :param path: the path of the entry file
+        :param options: a dictionary of the compile options
+        :param file_hash: Optional hash of the contents of the entry file, read from the file if not given
+        :return: the hex digest identifying the manifest
+        """
+        if file_hash is None:
+            file_hash = CompileCache.hash_file(path)
+
+        key = hashlib.sha256()
+        key.update(__version__.encode('utf-8'))
+        key.update(os.path.realpath(path).encode('utf-8'))
+        key.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        key.update((file_hash or '').encode('utf-8'))
+        return key.hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self, name, mode='rb'):
+        with open(self._path(name), mode) as f:
+            return f.read()
+
+    def _write(self, name, data, mode='wb'):
+        # write to a temporary file first so that a concurrent reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(name))
+
+    def lookup(self, path, options, avm_name=None):
+        """
+        Look up the compiled output of a file.
+
+        :param path: the path of the entry file
+        :param options: a dictionary of the compile options
+        :param avm_name: the name to record in the debug map, defaults to the name stored in the cache
+        :return: a tuple of the script bytes and the debug map json, or ``None`` on a miss
+        """
+        manifest_name = '%s.manifest.json' % CompileCache.entry_key(path, options)
+
+        try:
+            manifest = json.loads(self._read(manifest_name, 'r'))
+
+            for dependency, file_hash in manifest['dependencies'].items():
+                if CompileCache.hash_file(dependency) != file_hash:
+                    raise KeyError(dependency)
+
+            key = manifest['key']
+            data = self._read('%s.avm' % key)
+            debug_json = self._read('%s.debug.json' % key, 'r')
+
+            for name in [manifest_name, '%s.avm' % key, '%s.debug.json' % key]:
+                os.utime(self._path(name))
+
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        if avm_name is not None:
+            debug_data = json.loads(debug_json)
+            if debug_data['avm']['name'] != avm_name:
+                debug_data['avm']['name'] = avm_name
+                debug_json = json.dumps(debug_data, indent=4)
+
+        self.hits += 1
+        return data, debug_json
+
+    def store(self, path, options, dependencies, data, debug_json):
+        """
+        Add the compiled output of a file to the cache.
+
+        The hashes must be those of the sources the compiler parsed, such as
+        ``CompileContext.dependency_hashes``, rather than read from the files afterwards: a file
+        changed while compiling then no longer matches, instead of the output compiled from its old
+        contents being stored under its new ones.
+
+        :param path: the path of the entry file
+        :param options: a dictionary of the compile options
+        :param dependencies: a dictionary of the hash of every file loaded while compiling, by path
+        :param data: the compiled script
+        :param debug_json: the debug map json
+        """
+        entry = os.path.realpath(path)
+        entry_hash = next((file_hash for dependency, file_hash in dependencies.items()
+                           if os.path.realpath(dependency) == entry), None)
+        entry_key = CompileCache.entry_key(path, options, entry_hash)
+
+        manifest = {'dependencies': {}}
+        key = hashlib.sha256(entry_key.encode('utf-8'))
+
+        for dependency in sorted(dependencies):
+            file_hash = dependencies[dependency]
+            manifest['dependencies'][dependency] = file_hash
+            key.update(dependency.encode('utf-8'))
+            key.update((file_hash or '').encode('utf-8'))
+
+        manifest['key'] = key.hexdigest()
+
+        self._write('%s.avm' % manifest['key'], bytes(data))
+        self._write('%s.debug.json' % manifest['key'], debug_json, 'w')
+        self._write('%s.manifest.json' % entry_key, json.dumps(manifest), 'w')
+
+        self.evict()
+
+    @property
+    def size(self):
+        """
+        The total size in bytes of the files in the cache.
+        """
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache is no larger than ``max_size``.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_size:
+            return
+
+        for mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_size:
+                break
+
+    def clear(self):
+        """
+        Remove every file from the cache.
+        """
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                os.remove(entry.path)
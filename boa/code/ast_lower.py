@@ -0,0 +1,218 @@
+from bytecode import Bytecode, Instr
+from collections import OrderedDict
+import ast
+import sys
+import threading
+
+
+# the opcode of each binary and unary operator, as compiled by CPython
+BINARY_OPS = {
+    ast.Add: 'BINARY_ADD',
+    ast.Sub: 'BINARY_SUBTRACT',
+    ast.Mult: 'BINARY_MULTIPLY',
+    ast.MatMult: 'BINARY_MATRIX_MULTIPLY',
+    ast.Div: 'BINARY_TRUE_DIVIDE',
+    ast.FloorDiv: 'BINARY_FLOOR_DIVIDE',
+    ast.Mod: 'BINARY_MODULO',
+    ast.Pow: 'BINARY_POWER',
+    ast.LShift: 'BINARY_LSHIFT',
+    ast.RShift: 'BINARY_RSHIFT',
+    ast.BitOr: 'BINARY_OR',
+    ast.BitXor: 'BINARY_XOR',
+    ast.BitAnd: 'BINARY_AND',
+}
+
+UNARY_OPS = {
+    ast.UAdd: 'UNARY_POSITIVE',
+    ast.USub: 'UNARY_NEGATIVE',
+    ast.Not: 'UNARY_NOT',
+    ast.Invert: 'UNARY_INVERT',
+}
+
+# method calls are compiled to LOAD_METHOD and CALL_METHOD from Python 3.7
+HAS_LOAD_METHOD = sys.version_info >= (3, 7)
+
+MAX_COMPILED = 4096
+
+
+class CompiledExpressions(object):
+    """
+    The instructions of the expressions that are compiled rather than lowered, by their
+    ``ast.dump``, so that an expression used in several places is only compiled once.
+
+    Each ``boa.code.registry.ModuleRegistry`` holds one, so they are shared by the compilations
+    sharing a registry. They may be shared between threads.
+    """
+
+    max_entries = None
+
+    _templates = None
+    _lock = None
+
+    def __init__(self, max_entries=MAX_COMPILED):
+        """
+        :param max_entries: the number of expressions to keep, the least recently used are dropped first
+        """
+        self.max_entries = max_entries
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, key):
+        """
+        :param key: the ``ast.dump`` of an expression
+        :return: a tuple of the name and argument of each of its instructions, or None
+        """
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+            return template
+
+    def add(self, key, template):
+        """
+        Keep the instructions of an expression.
+
+        :param key: the ``ast.dump`` of the expression
+        :param template: a tuple of the name and argument of each of its instructions
+        """
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every expression kept.
+        """
+        with self._lock:
+            self._templates = OrderedDict()
+
+
+def _constant(node):
+    """
+    :return: a tuple holding the value of `node` if it is a constant, or None
+    """
+    if isinstance(node, ast.Num):
+        return (node.n,)
+    if isinstance(node, (ast.Str, ast.Bytes)):
+        return (node.s,)
+    if isinstance(node, ast.NameConstant):
+        return (node.value,)
+    if isinstance(node, ast.Constant) and node.value is not Ellipsis:
+        return (node.value,)
+    return None
+
+
+def _is_foldable(node):
+    """
+    Check whether CPython folds `node` into a single constant when compiling it.
+    """
+    if _constant(node) is not None:
+        return True
+    if isinstance(node, ast.BinOp):
+        return _is_foldable(node.left) and _is_foldable(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _is_foldable(node.operand)
+    if isinstance(node, ast.Tuple):
+        return all(_is_foldable(item) for item in node.elts)
+    return False
+
+
+def _lower(node, lineno, output):
+    """
+    Append the instructions evaluating `node` to `output`.
+
+    :return: False if `node` can not be lowered directly
+    """
+    constant = _constant(node)
+    if constant is not None:
+        output.append(Instr('LOAD_CONST', constant[0], lineno=lineno))
+        return True
+
+    if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+        output.append(Instr('LOAD_NAME', node.id, lineno=lineno))
+        return True
+
+    if isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Load):
+        if not _lower(node.value, lineno, output):
+            return False
+        output.append(Instr('LOAD_ATTR', node.attr, lineno=lineno))
+        return True
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS and not _is_foldable(node):
+        if not _lower(node.left, lineno, output) or not _lower(node.right, lineno, output):
+            return False
+        output.append(Instr(BINARY_OPS[type(node.op)], lineno=lineno))
+        return True
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS and not _is_foldable(node):
+        if not _lower(node.operand, lineno, output):
+            return False
+        output.append(Instr(UNARY_OPS[type(node.op)], lineno=lineno))
+        return True
+
+    if isinstance(node, ast.Call) and not node.keywords and \
+            not any(isinstance(arg, ast.Starred) for arg in node.args):
+
+        is_method = HAS_LOAD_METHOD and isinstance(node.func, ast.Attribute)
+        if is_method:
+            if not _lower(node.func.value, lineno, output):
+                return False
+            output.append(Instr('LOAD_METHOD', node.func.attr, lineno=lineno))
+        elif not _lower(node.func, lineno, output):
+            return False
+
+        for arg in node.args:
+            if not _lower(arg, lineno, output):
+                return False
+
+        output.append(Instr('CALL_METHOD' if is_method else 'CALL_FUNCTION', len(node.args), lineno=lineno))
+        return True
+
+    return False
+
+
+def _compile(node, lineno, compiled):
+    """
+    Compile `node` as an expression on its own. The instructions of expressions without
+    labels are kept in `compiled`, if it is given.
+    """
+    key = ast.dump(node)
+    template = compiled.get(key) if compiled is not None else None
+
+    if template is None:
+        expression = ast.fix_missing_locations(ast.Expression(body=node))
+        bc = Bytecode.from_code(compile(expression, filename='<ast>', mode='eval'))
+        instructions = bc[:-1]
+
+        if all(isinstance(instr, Instr) for instr in instructions):
+            template = tuple((instr.name, instr.arg) for instr in instructions)
+            if compiled is not None:
+                compiled.add(key, template)
+        else:
+            for instr in instructions:
+                instr.lineno = lineno
+            return instructions
+
+    return [Instr(name, arg, lineno=lineno) for name, arg in template]
+
+
+def ast_to_instr(node, lineno, compiled=None):
+    """
+    Lower an expression to the instructions CPython would compile it to, on its own.
+
+    Constants, names, attributes, calls and operators are lowered directly. Anything else,
+    and any expression CPython would fold into a constant, is compiled.
+
+    :param node: the ``ast`` node of the expression
+    :param lineno: the line number to give every instruction
+    :param compiled: Optional ``CompiledExpressions`` to reuse the expressions compiled from
+    :return: a list of ``bytecode.Instr``
+    """
+    output = []
+    if _lower(node, lineno, output):
+        return output
+    return _compile(node, lineno, compiled)
@@ -1,7 +1,5 @@
-from bytecode import Bytecode
 import ast
 from ast import NodeTransformer, NodeVisitor
-import inspect
 import pdb
 import dis
 
@@ -10,7 +8,12 @@ class RewriteDicts(NodeTransformer):
 
     last_store_name = None
 
-    updated_dicts = []
+    updated_dicts = None
+
+    def __init__(self):
+        super(RewriteDicts, self).__init__()
+        self.last_store_name = None
+        self.updated_dicts = []
 
     def visit_Dict(self, node):
         if len(node.keys):
@@ -36,21 +39,41 @@ class RewriteDicts(NodeTransformer):
         return node
 
 
-def preprocess_method_body(source_code_obj):
+def top_level_functions(body):
+    """
+    Find the functions defined at the top level of a module, including those defined inside
+    ``if``, ``for``, ``while``, ``try`` and ``with`` statements, but not those of classes.
+
+    :param body: the statements of the module
+    :return: a generator of ``ast.FunctionDef`` nodes
+    """
+    for node in body:
+        if isinstance(node, ast.FunctionDef):
+            yield node
+        elif not isinstance(node, (ast.ClassDef, ast.AsyncFunctionDef)):
+            for field in ['body', 'orelse', 'finalbody']:
+                yield from top_level_functions(getattr(node, field, []))
+            for handler in getattr(node, 'handlers', []):
+                yield from top_level_functions(handler.body)
+
 
-    src = inspect.getsource(source_code_obj)
+def preprocess_module(tree):
+    """
+    Rewrite the dictionaries of every function defined at the top level of a module, so the
+    module only has to be compiled once.
 
-    ast_tree = ast.parse(src)
+    :param tree: the ``ast.Module`` of the module, changed in place
+    :return: a dictionary from the name and first line of each function to its dictionary definitions
+    """
+    dictionary_defs = {}
 
-    visitor = RewriteDicts()
-    ast_tree = visitor.visit(ast_tree)
+    for node in top_level_functions(tree.body):
+        visitor = RewriteDicts()
+        visitor.visit(node)
 
-    ast.fix_missing_locations(ast_tree)
-    updated_code = compile(ast_tree, filename='<ast>', mode='exec')
-    bc = Bytecode.from_code(updated_code)
+        first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        dictionary_defs[(node.name, first_line)] = visitor.updated_dicts
 
-    dlist = visitor.updated_dicts
-    RewriteDicts.updated_dicts = []
-    RewriteDicts.last_store_name = None
+    ast.fix_missing_locations(tree)
 
-    return bc[0].arg, dlist
+    return dictionary_defs
@@ -0,0 +1,112 @@
+from boa.code.diagnostics import Diagnostics
+from boa.code.optimize import DEFAULT_LEVEL, PassManager
+from boa.code.registry import ModuleRegistry
+from boa.code.stats import CompileStats
+import os
+
+
+class CompileContext(object):
+    """
+    Holds all of the state used while compiling a single contract.
+
+    Each call to ``Compiler.load`` creates a new context, and every ``Module`` and
+    ``method`` created during that compilation refers back to it. Nothing is stored
+    at the class or module level, so separate contracts can be compiled at the same
+    time in different threads. What compilations share, such as the parsed files and
+    compiled expressions of the ``registry``, is guarded by locks, as is the process wide
+    ``tracemalloc`` tracing of ``boa.code.stats``.
+    """
+
+    nep8 = True
+
+    lean = False
+
+    optimize = DEFAULT_LEVEL
+
+    optimizer = None
+
+    entry_module = None
+
+    modules = None
+
+    registry = None
+
+    resolver = None
+
+    stats = None
+
+    diagnostics = None
+
+    _modules_by_name = None
+
+    def __init__(self, use_nep8=True, registry=None, resolver=None, trace_memory=False, lean=False,
+                 optimize=DEFAULT_LEVEL):
+        """
+        Create a context for a compilation.
+
+        :param use_nep8: whether to compile with NEP8 stack isolation
+        :param registry: Optional ``boa.code.registry.ModuleRegistry`` shared with other compilations
+        :param resolver: Optional callable taking the name of an imported module and returning a
+            ``(filename, source)`` tuple for it, or None to import it from the file system
+        :param trace_memory: measure the peak memory used with ``tracemalloc``, see ``boa.code.stats.CompileStats``
+        :param lean: free what each method was tokenized from as soon as it is tokenized, see ``boa.code.method.method.release``
+        :param optimize: the optimization level, see ``boa.code.optimize``
+        """
+        self.nep8 = use_nep8
+        self.lean = lean
+        self.optimize = optimize
+        self.optimizer = PassManager(optimize)
+        self.entry_module = None
+        self.modules = []
+        self.registry = registry if registry is not None else ModuleRegistry()
+        self.resolver = resolver
+        self.stats = CompileStats(trace_memory=trace_memory)
+        self.diagnostics = Diagnostics()
+        self._modules_by_name = {}
+
+    @property
+    def dependencies(self):
+        """
+        The paths of every file loaded during this compilation, including the entry file.
+
+        :return: a list of file paths
+        :rtype: list
+        """
+        paths = []
+        for module in self.modules:
+            if module.path not in paths:
+                paths.append(module.path)
+        return paths
+
+    @property
+    def dependency_hashes(self):
+        """
+        The digest of the source of every file loaded during this compilation, as it was parsed,
+        which may differ from the file on disk if it was changed while compiling.
+
+        :return: a dictionary of the digests by file path
+        :rtype: dict
+        """
+        hashes = {}
+        for module in self.modules:
+            hashes.setdefault(module.path, module.digest)
+        return hashes
+
+    def add_module(self, module):
+        """
+        Record a module loaded during this compilation.
+
+        :param module: the ``boa.code.module.Module`` that was loaded
+        """
+        self.modules.append(module)
+        self._modules_by_name[(os.path.realpath(module.path), module.module_name)] = module
+
+    def find_module(self, path, module_name):
+        """
+        Look up a module that has already been loaded during this compilation.
+
+        :param path: the path of the module file
+        :param module_name: the name the module was imported as
+        :return: the ``boa.code.module.Module`` or None if it has not been loaded
+        """
+        return self._modules_by_name.get((os.path.realpath(path), module_name))
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+
+
+INFO = 10
+WARNING = 20
+ERROR = 30
+
+SEVERITY_NAMES = {INFO: 'info', WARNING: 'warning', ERROR: 'error'}
+
+
+class Diagnostic(object):
+    """
+    A single message about the contract being compiled.
+
+    The message is kept as a format string and its arguments, and only formatted when it is read.
+    """
+
+    __slots__ = ['severity', 'code', 'path', 'lineno', 'method', '_message', '_args']
+
+    def __init__(self, severity, code, message, args=(), path=None, lineno=None, method=None):
+        self.severity = severity
+        self.code = code
+        self.path = path
+        self.lineno = lineno
+        self.method = method
+        self._message = message
+        self._args = args
+
+    @property
+    def message(self):
+        return self._message % self._args if self._args else self._message
+
+    @property
+    def severity_name(self):
+        return SEVERITY_NAMES.get(self.severity, str(self.severity))
+
+    def to_dict(self):
+        """
+        :return: the diagnostic as a dictionary
+        :rtype: dict
+        """
+        return OrderedDict([
+            ('severity', self.severity_name),
+            ('code', self.code),
+            ('message', self.message),
+            ('path', self.path),
+            ('line', self.lineno),
+            ('method', self.method),
+        ])
+
+    def __str__(self):
+        location = ''
+        if self.path is not None:
+            location = '%s:%s: ' % (self.path, self.lineno) if self.lineno is not None else '%s: ' % self.path
+        method = ' in %s()' % self.method if self.method is not None else ''
+        return '%s%s%s: %s' % (location, self.severity_name, method, self.message)
+
+
+class Diagnostics(object):
+    """
+    Collects the messages of a single compilation, instead of printing or logging them.
+
+    Every message is counted by its code, but only the first ``limit`` are kept. Nothing is
+    formatted until it is read:
+
+    .. code-block:: python
+
+        from boa.compiler import Compiler
+
+        compiler = Compiler.load('path/to/your/file.py')
+        compiler.write()
+
+        for diagnostic in compiler.diagnostics.filter(WARNING):
+            print(diagnostic)
+        print(compiler.diagnostics.counts)
+    """
+
+    limit = 1000
+
+    counts = None
+
+    _items = None
+
+    def __init__(self, limit=1000):
+        """
+        :param limit: the number of messages to keep, the rest are only counted
+        """
+        self.limit = limit
+        self.counts = OrderedDict()
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, severity, code, message, *args, path=None, lineno=None, method=None):
+        """
+        Record a message.
+
+        :param severity: ``INFO``, ``WARNING`` or ``ERROR``
+        :param code: a short name for the kind of message, such as ``op_not_converted``
+        :param message: the message, as a format string for `args`
+        :param args: the arguments of the message
+        :param path: Optional path of the file the message is about
+        :param lineno: Optional line in that file
+        :param method: Optional name of the method the message is about
+        """
+        self.counts[code] = self.counts.get(code, 0) + 1
+        if len(self._items) < self.limit:
+            self._items.append(Diagnostic(severity, code, message, args, path, lineno, method))
+
+    def info(self, code, message, *args, **location):
+        self.add(INFO, code, message, *args, **location)
+
+    def warning(self, code, message, *args, **location):
+        self.add(WARNING, code, message, *args, **location)
+
+    def error(self, code, message, *args, **location):
+        self.add(ERROR, code, message, *args, **location)
+
+    def filter(self, severity=WARNING):
+        """
+        :param severity: the lowest severity to include
+        :return: the kept messages of at least `severity`
+        :rtype: list
+        """
+        return [item for item in self._items if item.severity >= severity]
+
+    @property
+    def errors(self):
+        return self.filter(ERROR)
+
+    @property
+    def warnings(self):
+        return [item for item in self._items if item.severity == WARNING]
+
+    def format(self, severity=WARNING):
+        """
+        :param severity: the lowest severity to include
+        :return: the kept messages of at least `severity`, one per line
+        :rtype: str
+        """
+        return '\n'.join(str(item) for item in self.filter(severity))
+
+    def to_list(self, severity=INFO):
+        """
+        :param severity: the lowest severity to include
+        :return: the kept messages of at least `severity`, as dictionaries
+        :rtype: list
+        """
+        return [item.to_dict() for item in self.filter(severity)]
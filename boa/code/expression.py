@@ -1,9 +1,8 @@
 from bytecode import Instr, Compare, Label
 from boa.code import pyop
 from boa.code.pytoken import PyToken
-from bytecode import Bytecode
+from boa.code.ast_lower import ast_to_instr
 import ast
-import astor
 
 
 class Expression(object):
@@ -71,37 +70,7 @@ class Expression(object):
                 if instr.arg in replaceable_attr_calls:
                     instr.opcode = pyop.LOAD_GLOBAL
                 else:
-                    attr_name = 'Get%s' % instr.arg
-                    module_methods = self.container_method.module.methods
-                    matches = []
-                    for n in module_methods:
-                        if attr_name in n.full_name:
-                            matches.append(n)
-
-                    # these two are special cases for name collisions between
-                    # block.Hash, tx.Hash, and input.Hash
-                    if len(matches) == 0:
-                        attr_name = 'GetTX%s' % instr.arg
-                        for n in module_methods:
-                            if attr_name in n.full_name:
-                                matches.append(n)
-                    if len(matches) == 0:
-                        attr_name = 'GetInput%s' % instr.arg
-                        for n in module_methods:
-                            if attr_name in n.full_name:
-                                matches.append(n)
-
-                    # Special case for enumerators/iterator
-                    if len(matches) == 0:
-                        attr_name = 'Enumerator%s' % instr.arg
-                        for n in module_methods:
-                            if attr_name in n.full_name:
-                                matches.append(n)
-                    if len(matches) == 0:
-                        attr_name = 'Iter%s' % instr.arg
-                        for n in module_methods:
-                            if attr_name == n.full_name.split('.')[-1]:
-                                matches.append(n)
+                    attr_name, matches = self.container_method.module.resolve_attribute(instr.arg)
 
                     if len(matches) == 0:
                         raise Exception("Could not load attribute %s " % instr.arg)
@@ -152,13 +121,7 @@ class Expression(object):
 
     def _ast_to_instr(self, astobj, lineno):
 
-        src = astor.to_source(astobj).replace('"""', "'")
-
-        cp = compile(src, filename='<ast>', mode='eval')
-        bc = Bytecode.from_code(cp)
-        instructions = bc[:-1]
-        for instr in instructions:
-            instr.lineno = lineno
+        instructions = ast_to_instr(astobj, lineno, self.container_method.module.context.registry.expressions)
 
         # if its calling a method, we don't want it to do `LOAD_NAME`
         if instructions[-1].opcode == pyop.CALL_FUNCTION and instructions[0].opcode == pyop.LOAD_NAME:
@@ -311,8 +274,13 @@ class Expression(object):
                 token.to_vm(self.tokenizer, last_token)
             except Exception as e:
                 cm = self.container_method
-                print("ERROR: %s:%s in %s() with msg - %s" % (cm.module.path, cm.start_line_no + ln - 1, cm.name, str(e)))
-                raise e
+                lineno = cm.start_line_no + ln - 1
+                message = str(e)
+                cm.module.context.diagnostics.error(type(e).__name__, '%s', message, path=cm.module.path,
+                                                    lineno=lineno, method=cm.name)
+                # callers that do not read the diagnostics still see where the error is
+                e.args = ('%s:%s: in %s(): %s' % (cm.module.path, lineno, cm.name, message),)
+                raise
             last_token = token
 
     def lookup_method_name(self, index):
@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+
+
+# the directory holding the ``boa`` package, so ``boa.interop`` always resolves to this compiler
+BOA_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ImportResolver(object):
+    """
+    Find the file of an imported module without importing it.
+
+    Importing a module with ``importlib`` runs it, keeps it in ``sys.modules`` for every later
+    compilation in the process, and needs the directory of the importing file on ``sys.path``.
+    Instead, the resolver looks for ``name.py`` or ``name/__init__.py`` in each search directory:
+    the directories it was given, the directory holding ``boa``, ``sys.path`` and last the
+    directory of the importing file. Relative imports are only looked up next to the importing file.
+
+    Each resolution is kept, along with the modification time of every directory searched for it,
+    so it is only searched again once a file is added, moved or removed there.
+
+    .. code-block:: python
+
+        from boa.code.imports import ImportResolver
+
+        resolver = ImportResolver(['path/to/shared/contracts'])
+        filename = resolver.resolve('helpers.storage', 'path/to/contract.py')
+
+    A resolver may be shared between threads.
+    """
+
+    search_path = None
+
+    hits = 0
+    misses = 0
+
+    _resolved = None
+    _lock = None
+
+    def __init__(self, search_path=None):
+        """
+        :param search_path: Optional list of directories to search before the default ones
+        """
+        self.search_path = [os.path.abspath(path) for path in search_path or []]
+        self.hits = 0
+        self.misses = 0
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._resolved)
+
+    def roots(self, importing_path, level=0):
+        """
+        Retrieve the directories a module is searched in, in order.
+
+        :param importing_path: the path of the file holding the import
+        :param level: the number of leading dots of a relative import, 0 for an absolute import
+        :return: a list of directories
+        :rtype: list
+        """
+        directory = os.path.dirname(os.path.abspath(importing_path))
+
+        if level > 0:
+            for _ in range(level - 1):
+                directory = os.path.dirname(directory)
+            return [directory]
+
+        roots = []
+        for path in self.search_path + [BOA_ROOT] + sys.path + [directory]:
+            path = os.path.abspath(path or os.curdir)
+            if path not in roots:
+                roots.append(path)
+        return roots
+
+    def resolve(self, name, importing_path, level=0):
+        """
+        Find the file of an imported module.
+
+        :param name: the dotted name of the module, as written in the import
+        :param importing_path: the path of the file holding the import
+        :param level: the number of leading dots of a relative import, 0 for an absolute import
+        :return: the path of the module file
+        :rtype: str
+        :raises ModuleNotFoundError: if no file is found for the module
+        """
+        roots = self.roots(importing_path, level)
+        key = (name, level, tuple(roots))
+
+        with self._lock:
+            entry = self._resolved.get(key)
+
+        if entry is not None and all(ImportResolver._stamp(path) == stamp for path, stamp in entry[1]):
+            with self._lock:
+                self.hits += 1
+            return entry[0]
+
+        filename, stamps = ImportResolver._search(name, roots)
+
+        with self._lock:
+            self.misses += 1
+            if filename is not None:
+                self._resolved[key] = (filename, stamps)
+
+        if filename is None:
+            raise ModuleNotFoundError("No module named '%s'" % name, name=name)
+        return filename
+
+    def clear(self):
+        """
+        Forget every resolution.
+        """
+        with self._lock:
+            self._resolved = {}
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _search(name, roots):
+        """
+        :return: a tuple of the path of the module file, or None, and the ``(path, mtime)`` of each
+            directory that decided the result
+        """
+        parts = [part for part in name.split('.') if part]
+        stamps = []
+
+        for root in roots:
+            directory = root
+
+            # the deepest existing directory on the way to the module, as adding a file to it
+            # could change where the module is found
+            for part in parts[:-1]:
+                if not os.path.isdir(os.path.join(directory, part)):
+                    break
+                directory = os.path.join(directory, part)
+            stamps.append((directory, ImportResolver._stamp(directory)))
+
+            # a package is found before a module of the same name, as Python does
+            package = os.path.join(root, *parts)
+            candidates = [os.path.join(package, '__init__.py')]
+            if parts:
+                candidates.append(package + '.py')
+
+            for candidate in candidates:
+                if os.path.isfile(candidate):
+                    return candidate, stamps
+
+            if os.path.isdir(package):
+                stamps.append((package, ImportResolver._stamp(package)))
+
+        return None, stamps
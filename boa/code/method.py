@@ -1,9 +1,11 @@
 from bytecode import Instr, Bytecode, Label
-from boa.code.vmtoken import VMTokenizer, Nep8VMTokenizer
+from boa.code.vmtoken import VMTokenizer, Nep8VMTokenizer, MIN_JUMP_OFFSET, MAX_JUMP_OFFSET
+from boa.interop import VMOp
 from boa.code.expression import Expression
+from boa.code.pytoken import DebugToken
 from boa.code import pyop
-from boa.code.ast_preprocess import preprocess_method_body
 from uuid import uuid4
+import hashlib
 
 import pdb
 import dis
@@ -16,11 +18,8 @@ class method(object):
 
     block = None
 
-    blocks = []
-
     stack_size = 0
 
-    tokens = []
     tokenizer = None
 
     address = 0
@@ -45,6 +44,13 @@ class method(object):
 
     _id = None
 
+    _prepared = None
+
+    _is_interop = None
+
+    # the number of Python instructions in the method
+    instruction_count = 0
+
     code_object = None
 
     @property
@@ -69,11 +75,11 @@ class method(object):
 
     @property
     def is_interop(self):
-        if 'boa.interop' in self.full_name:
-            return True
-        if 'boa.builtins' in self.full_name and self.full_name != 'boa.builtins.range':
-            return True
-        return False
+        if self._is_interop is None:
+            full_name = self.full_name
+            self._is_interop = 'boa.interop' in full_name or \
+                ('boa.builtins' in full_name and full_name != 'boa.builtins.range')
+        return self._is_interop
 
     @property
     def full_name(self):
@@ -89,9 +95,30 @@ class method(object):
     def args(self):
         return self.bytecode.argnames
 
+    @property
+    def fingerprint(self):
+        """
+        A digest of everything the tokens of this method depend on: its source, the globals
+        and methods of its module and the compile options. Two methods with the same fingerprint
+        are tokenized identically, apart from the line the method starts on.
+
+        :return: the fingerprint of the method
+        :rtype: str
+        """
+        digest = hashlib.sha1()
+        for part in [self.module.path, self.full_name, self.module.parsed.method_source(self.code_object),
+                     self.module.environment]:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
     @property
     def stacksize(self):
-        return self.bytecode.argcount + len(self._blocks) + 2
+        """
+        The number of locals of the method, including its arguments. Only final once the method
+        is tokenized, as tokenizing ``for`` loops adds locals.
+        """
+        return len(self._scope)
 
     def __init__(self, module, block, module_name, extra):
         self.module = module
@@ -104,9 +131,11 @@ class method(object):
         self.code_object = self.block[0].arg
 
 #        dis.dis(code_object)
-        self.code, self.dictionary_defs = preprocess_method_body(self.code_object)
+        self.code, dictionary_defs, self.bytecode = module.parsed.method_body(self.code_object, module.context.stats)
 
-        self.bytecode = Bytecode.from_code(self.code)
+        # the parsed body is shared with other compilations, so work on copies of it
+        self.dictionary_defs = list(dictionary_defs)
+        self.instruction_count = len([instr for instr in self.bytecode if isinstance(instr, Instr)])
 
         self.setup()
 
@@ -134,6 +163,7 @@ class method(object):
             for item in self._extra:
                 if item[-1].opcode == pyop.STORE_NAME:
                     if item[-1].arg in gbl:
+                        item = method.copy_block(item)
                         global_blocks.append(item)
                         self.add_to_scope(item[-1].arg)
                         if item[0].opcode == pyop.LOAD_NAME:
@@ -148,8 +178,10 @@ class method(object):
                 if len(instructions):
                     blocks.append(instructions)
                 instructions = []
-            if not isinstance(instr, Label) and instr.opcode == pyop.STORE_FAST:
-                self.add_to_scope(instr.arg)
+            if not isinstance(instr, Label):
+                if instr.opcode == pyop.STORE_FAST:
+                    self.add_to_scope(instr.arg)
+                instr = instr.copy()
 
             instructions.append(instr)
         if len(instructions):
@@ -157,21 +189,61 @@ class method(object):
 
         self._blocks = blocks
 
-        from ..compiler import Compiler
-        if Compiler.instance().nep8:
+        if self.module.context.nep8:
             self.tokenizer = Nep8VMTokenizer(self)
         else:
             self.tokenizer = VMTokenizer(self)
 
         self._expressions = []
 
+    @staticmethod
+    def copy_block(block):
+        """
+        Copy the instructions of a block, so that they can be changed while tokenizing.
+
+        :param block: a list of instructions and labels
+        :return: a new list of copied instructions and the same labels
+        """
+        return [instr.copy() if isinstance(instr, Instr) else instr for instr in block]
+
     def add_to_scope(self, argname):
         if argname not in self.scope.keys():
             current_total = len(self._scope)
             self._scope[argname] = current_total
 
+    def reuse(self, previous):
+        """
+        Take over the tokens of a method prepared by an earlier compilation, instead of tokenizing
+        this method again. Only valid when both methods have the same ``fingerprint``.
+
+        :param previous: the method prepared by the earlier compilation, which must not be used afterwards
+        """
+        self._scope = previous._scope
+        self._blocks = previous._blocks
+        self._expressions = previous._expressions
+        self._forloop_counter = previous._forloop_counter
+        self.tokenizer = previous.tokenizer
+        self.tokenizer.method = self
+
+        for exp in self._expressions:
+            exp.container_method = self
+
+        # linking moved the tokens to the address of the previous method, so restore them
+        for vmtoken, addr, data in previous._prepared:
+            vmtoken.addr = addr
+            vmtoken.data = data
+            if vmtoken.src_method is previous:
+                vmtoken.src_method = self
+
+        self._prepared = previous._prepared
+
     def prepare(self):
 
+        if self._prepared is not None:
+            return
+
+        stats = self.module.context.stats
+
         last_exp = None
         for block in self._blocks:
             exp = Expression(block, self.tokenizer, self)
@@ -180,35 +252,73 @@ class method(object):
                 last_exp.next = exp
             last_exp = exp
 
-        for exp in self._expressions:
-            exp.tokenize()
+        with stats.phase('tokenize'):
+            for exp in self._expressions:
+                exp.tokenize()
+            self.tokenizer.update_frame_size()
+
+        with stats.phase('convert_jumps'):
+            self.convert_breaks()
+            self.convert_jumps()
+
+        with stats.phase('optimize'):
+            self.module.context.optimizer.run(self)
 
-        self.convert_breaks()
-        self.convert_jumps()
+        if self.module.context.lean:
+            self.release()
+        else:
+            self._prepared = [(vmtoken, vmtoken.addr, vmtoken.data) for vmtoken in self.vm_tokens.values()]
+
+    def release(self):
+        """
+        Free everything used to tokenize this method, keeping only its tokens and what linking and
+        the debug map need of them. The method can not be tokenized, reused or printed with
+        ``Module.to_s`` afterwards.
+        """
+        debug_tokens = {}
+        for vmtoken in self.vm_tokens.values():
+            pytoken = vmtoken.pytoken
+            if pytoken is not None:
+                debug_token = debug_tokens.get(id(pytoken))
+                if debug_token is None:
+                    debug_token = debug_tokens[id(pytoken)] = DebugToken(pytoken)
+                vmtoken.pytoken = debug_token
+
+        self.tokenizer.labels = {}
+        self.block = None
+        self.code = None
+        self.code_object = None
+        self.bytecode = None
+        self.dictionary_defs = None
+        self._extra = None
+        self._blocks = None
+        self._expressions = None
+        self._prepared = ()
 
     def convert_jumps(self):
-        filtered = []
+        labels = self.tokenizer.labels
         for vmtoken in self.tokenizer.vm_tokens.values():
-            if vmtoken.pytoken:
-                filtered.append(vmtoken)
-        for vmtoken in filtered:
-            if vmtoken.pytoken.jump_from and not vmtoken.pytoken.jump_found:
-                for vmtoken2 in filtered:
-                    if vmtoken2.pytoken.jump_target == vmtoken.pytoken.jump_from:
-                        diff = vmtoken2.addr - vmtoken.addr
-                        vmtoken.data = diff.to_bytes(2, 'little', signed=True)
-                        vmtoken2.pytoken.jump_from_addr = vmtoken.addr
-                        vmtoken.pytoken.jump_to_addr = vmtoken2.addr
+            if vmtoken.pytoken and vmtoken.pytoken.jump_from and not vmtoken.pytoken.jump_found:
+                for vmtoken2 in labels.get(vmtoken.pytoken.jump_from, []):
+                    diff = vmtoken2.addr - vmtoken.addr
+                    if diff < MIN_JUMP_OFFSET or diff > MAX_JUMP_OFFSET:
+                        raise Exception("Jump of %s bytes in method %s at line %s is out of range, split the method up" % (
+                            diff, self.full_name, vmtoken.pytoken.lineno))
+                    vmtoken.data = diff.to_bytes(2, 'little', signed=True)
+                    vmtoken2.pytoken.jump_from_addr = vmtoken.addr
+                    vmtoken.pytoken.jump_to_addr = vmtoken2.addr
 
     def convert_breaks(self):
-        tokens = list(self.tokenizer.vm_tokens.values())
-        setup_token_label = None
+        # the exit labels of the loops the current token is in, innermost last
+        loops = []
 
-        for tkn in tokens:
+        for tkn in self.tokenizer.vm_tokens.values():
             if tkn.pytoken:
+                if loops and tkn.pytoken.jump_target is loops[-1]:
+                    loops.pop()
                 if tkn.pytoken.pyop == pyop.SETUP_LOOP:
-                    setup_token_label = tkn.pytoken.jump_from
+                    loops.append(tkn.pytoken.jump_from)
                 if tkn.pytoken.pyop == pyop.BREAK_LOOP:
-                    if not setup_token_label:
+                    if not loops:
                         raise Exception("No loopsetup for break")
-                    tkn.pytoken.jump_from = setup_token_label
+                    tkn.pytoken.jump_from = loops[-1]
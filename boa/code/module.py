@@ -2,22 +2,39 @@ from boa.code import pyop
 from boa.code.method import method as BoaMethod
 from boa.code.action import action as BoaAction
 from boa.code.appcall import appcall as BoaAppcall
+from boa.code.context import CompileContext
+from boa.code.registry import ModuleRegistry
 
 from boa.util import BlockType, get_block_type
-from bytecode import UNSET, Bytecode, BasicBlock, ControlFlowGraph, dump_bytecode, Label
+from bytecode import UNSET, Bytecode, BasicBlock, ControlFlowGraph, dump_bytecode, Label, Instr
+from boa.code.vmtoken import VMToken, MIN_JUMP_OFFSET, MAX_JUMP_OFFSET, push_value
 from boa.interop import VMOp
-import importlib
-from logzero import logger
-from collections import OrderedDict
+from types import CodeType
 import os
-import sys
 import hashlib
 from boa import __version__
 import json
 
 
+# the prefixes of the interop methods an attribute such as ``tx.Hash`` may be loaded with, in
+# the order they are tried. ``GetTX`` and ``GetInput`` tell ``tx.Hash`` and ``input.Hash`` apart
+# from ``block.Hash``. An attribute is also loaded with an ``Iter`` method of exactly its name
+ATTRIBUTE_PREFIXES = ['Get', 'GetTX', 'GetInput', 'Enumerator']
+
+# how many times the methods may be laid out again to bring every call within range
+MAX_RELAX_PASSES = 64
+
+# the room left between a call and a trampoline, for trampolines placed in between later
+RELAX_MARGIN = 1024
+
+
 class Module(object):
 
+    parsed = None
+
+    # the digest of the source this module was parsed from, kept once the parsed file is released
+    digest = None
+
     bc = None
     cfg = None
 
@@ -29,7 +46,9 @@ class Module(object):
 
     path = None
 
-    all_vm_tokens = OrderedDict()
+    context = None
+
+    all_vm_tokens = None
 
     module_name = ''
 
@@ -39,6 +58,15 @@ class Module(object):
 
     _local_methods = None
 
+    _environment = None
+
+    _attribute_index = None
+
+    # the symbol index of the methods, kept up to date by ``add_method``
+    _by_name = None
+    _by_full_name = None
+    _main = None
+
     @property
     def extra_instructions(self):
         return self._extra_instr
@@ -48,74 +76,117 @@ class Module(object):
         return self._local_methods
 
     @staticmethod
-    def ImportFromBlock(block: BasicBlock, current_file_path):
+    def ImportFromBlock(block: BasicBlock, current_file_path, context=None):
 
         mpath = None
         mnames = []
-
-        filepath = os.path.dirname(os.path.abspath(current_file_path))
-
-        sys.path.append(filepath)
+        level = 0
 
         for index, instr in enumerate(block):
             if instr.opcode == pyop.IMPORT_NAME:
                 mpath = instr.arg
+                # the import is preceded by its level and its fromlist
+                if index >= 2 and block[index - 2].opcode == pyop.LOAD_CONST:
+                    level = block[index - 2].arg or 0
             elif instr.opcode == pyop.STORE_NAME:
                 if instr.arg not in mnames:
                     mnames.append(instr.arg)
             elif instr.opcode == pyop.IMPORT_STAR:
                 mnames = ['*']
 
-        pymodule = importlib.import_module(mpath, mpath)
-        filename = pymodule.__file__
-        return Module(filename, mpath, mnames)
+        source = None
+        resolved = context.resolver(mpath) if context is not None and context.resolver else None
+
+        if resolved is not None:
+            filename, source = resolved
+        else:
+            registry = context.registry if context is not None else ModuleRegistry()
+            filename = registry.imports.resolve(mpath, current_file_path, level)
+
+        if context is not None:
+            module = context.find_module(filename, mpath)
+            if module is not None:
+                return module
+
+        return Module(filename, mpath, mnames, context=context, source=source)
 
     @property
     def main(self):
         """
         Return the default method in this module.
 
+        This is the last method named ``Main`` or ``main``, or else the last method defined.
+
         :return: the default method in this module
         :rtype: ``boa.code.method.Method``
         """
 
-        for m in self.methods:
-
-            if m.name in ['Main', 'main']:
-                return m
+        if self._main is not None:
+            return self._main
 
         if len(self.methods):
-            return self.methods[0]
+            return self.methods[-1]
 
         return None
 
     @property
     def orderered_methods(self):
         """
-        An ordered list of methods
+        An ordered list of methods: the default method, then the others from the last defined
+        to the first.
 
         :return: A list of ordered methods is this module
         :rtype: list
         """
 
-        oms = []
-
-        self.methods.reverse()
+        main = self.main
 
-        if self.main:
-            oms = [self.main]
+        oms = [main] if main else []
 
-        for m in self.methods:
+        for m in reversed(self.methods):
 
-            if m == self.main:
+            if m is main:
                 continue
             oms.append(m)
 
         return oms
 
+    @property
+    def environment(self):
+        """
+        A description of everything in this module, apart from its own source, that the methods
+        defined in it depend on when tokenized: the names of the methods it can call, its globals,
+        actions and app calls, whether NEP8 is used and the optimization level.
+
+        :return: the environment of the module
+        :rtype: str
+        """
+        if self._environment is None:
+            globals = []
+            for block in self._extra_instr:
+                for instr in block:
+                    if isinstance(instr, Instr):
+                        # labels and code objects are described by their type, as their repr includes their address
+                        arg = type(instr.arg).__name__ if isinstance(instr.arg, (Label, CodeType)) else repr(instr.arg)
+                        globals.append((instr.name, arg, instr.lineno))
+
+            self._environment = repr((
+                self.context.nep8,
+                self.context.optimize,
+                [m.full_name for m in self.methods],
+                globals,
+                [(a.method_name, a.event_name, a.event_args) for a in self.actions],
+                [(a.method_name, a.script_args) for a in self.app_call_registrations],
+            ))
+        return self._environment
+
     def method_by_name(self, method_name):
         """
-        Look up a method by its name from the module ``methods`` list.
+        Look up a method by its full name or its name in the symbol index of the module.
+
+        When several methods share a name, the last of them added is used, as a later definition
+        shadows an earlier one.
+
         :param method_name: the name of the method to look up
         :type method_name: str
 
@@ -123,48 +194,127 @@ class Module(object):
         :rtype: ``boa.code.method.Method``
         """
 
-        #        print("METHODS FOR MODULE: %s " % self.path)
-        for m in self.methods:
-            if m.full_name == method_name or m.name == method_name:
-                return m
+        method = self._by_full_name.get(method_name)
+        if method is None:
+            method = self._by_name.get(method_name)
+        return method
 
-        return None
+    def method_named(self, name):
+        """
+        Look up a method by its name only, ignoring full names.
+
+        :param name: the name of the method, such as ``GetHash``
+        :return: the last method added with that name, or None
+        :rtype: ``boa.code.method.Method``
+        """
+
+        return self._by_name.get(name)
+
+    def add_method(self, method):
+        """
+        Add a method to the module and to its symbol index.
+
+        :param method: the method to add
+        :type method: ``boa.code.method.Method``
+        """
+
+        self.methods.append(method)
+        self._by_name[method.name] = method
+        self._by_full_name[method.full_name] = method
+        if method.name in ['Main', 'main']:
+            self._main = method
+
+    @staticmethod
+    def attribute_table(methods):
+        """
+        Index the methods an attribute can be loaded with.
+
+        An attribute ``attr`` matches a method for a prefix in ``ATTRIBUTE_PREFIXES`` when the prefix
+        followed by ``attr`` appears in the full name of the method, and for ``Iter`` when the name of
+        the method is ``Iter`` followed by ``attr``.
+
+        :param methods: a list of methods
+        :return: a list of ``(prefix, dictionary of the matching methods by attribute)`` tuples, in
+            the order they are tried
+        :rtype: list
+        """
+
+        table = []
+        for prefix in ATTRIBUTE_PREFIXES:
+            by_attr = {}
+            for m in methods:
+                attrs = set()
+                start = m.full_name.find(prefix)
+                while start >= 0:
+                    # an attribute holds no dots, so it can only match up to the next one
+                    rest = m.full_name[start + len(prefix):].split('.', 1)[0]
+                    for end in range(1, len(rest) + 1):
+                        attrs.add(rest[:end])
+                    start = m.full_name.find(prefix, start + 1)
+                for attr in attrs:
+                    by_attr.setdefault(attr, []).append(m)
+            table.append((prefix, by_attr))
+
+        by_attr = {}
+        for m in methods:
+            name = m.full_name.split('.')[-1]
+            if name.startswith('Iter'):
+                by_attr.setdefault(name[len('Iter'):], []).append(m)
+        table.append(('Iter', by_attr))
+
+        return table
+
+    def resolve_attribute(self, attr):
+        """
+        Look up the interop method to load an attribute with, such as ``GetHash`` for ``block.Hash``.
+
+        :param attr: the name of the attribute
+        :return: a tuple of the name to load and the methods matching it, which hold more than one
+            method if the attribute is ambiguous, or ``(None, [])`` if nothing matches
+        :rtype: tuple
+        """
+
+        if self._attribute_index is None:
+            self._attribute_index = Module.attribute_table(self.methods)
+
+        for prefix, by_attr in self._attribute_index:
+            matches = by_attr.get(attr)
+            if matches:
+                return prefix + attr, matches
+        return None, []
 
     def has_method(self, full_name):
-        for m in self.methods:
-            if m.full_name == full_name:
-                return True
-        return False
+        return full_name in self._by_full_name
 
-    def __init__(self, path: str, module_name='', to_import=['*']):
+    def __init__(self, path: str, module_name='', to_import=['*'], context=None, source=None):
 
         self.path = path
         self.to_import = to_import
         self.module_name = module_name
+        self.context = context if context is not None else CompileContext()
+        self.context.add_module(self)
+        self.all_vm_tokens = {}
         self._local_methods = []
-        source = open(path, 'rb')
 
-        compiled_source = compile(source.read(), path, 'exec')
+        self.parsed = self.context.registry.parse(path, source, self.context.stats)
+        self.digest = self.parsed.digest
+        self.bc = self.parsed.bc
+        self.cfg = self.parsed.cfg
 
-        self.bc = Bytecode.from_code(compiled_source)
-        self.cfg = ControlFlowGraph.from_bytecode(self.bc)
-
-        source.close()
-
-        self.build()
+        with self.context.stats.phase('build'):
+            self.build()
+        self.context.stats.count('modules')
 
     def build(self):
         self.blocks = []
         self.methods = []
+        self._by_name = {}
+        self._by_full_name = {}
+        self._main = None
+        self._attribute_index = None
         self.actions = []
         self.app_call_registrations = []
 
-        for block in self.cfg:
-            start_ln = block[0].lineno
-            for index, instr in enumerate(block):
-                if instr.lineno != start_ln:
-                    self.cfg.split_block(block, index)
-
         self._extra_instr = []
         new_method_blks = []
         for blk in self.cfg:
@@ -172,13 +322,13 @@ class Module(object):
             if type == BlockType.MAKE_FUNCTION:
                 new_method_blks.append(blk)
             elif type == BlockType.IMPORT_ITEM:
-                new_module = Module.ImportFromBlock(blk, self.path)
+                new_module = Module.ImportFromBlock(blk, self.path, self.context)
                 if new_module:
                     for method in new_module.methods:
                         if not self.has_method(method.full_name):
-                            self.methods.append(method)
+                            self.add_method(method)
                     for method in new_module.local_methods:
-                        self.methods.append(method)
+                        self.add_method(method)
                     self._extra_instr = self._extra_instr + new_module.extra_instructions
             elif type == BlockType.UNKNOWN:
                 self._extra_instr.append(blk)
@@ -196,7 +346,17 @@ class Module(object):
             new_method = BoaMethod(self, m, self.module_name, self._extra_instr)
 
             if not self.has_method(new_method.full_name):
-                self.methods.append(new_method)
+                self.add_method(new_method)
+
+    def release(self):
+        """
+        Free the parsed file and the blocks of this module, once all of its methods are tokenized.
+        """
+        self.parsed = None
+        self.bc = None
+        self.cfg = None
+        self.blocks = None
+        self._extra_instr = None
 
     def write(self):
         """
@@ -208,9 +368,16 @@ class Module(object):
         :return: A bytestring of representing the current module
         :rtype: bytes
         """
-        self.link_methods()
+        with self.context.stats.tracing():
+            self.link_methods()
+
+            with self.context.stats.phase('write'):
+                script = self.write_methods()
 
-        return self.write_methods()
+        self.context.stats.count('bytes', len(script))
+        self.context.stats.finish()
+
+        return script
 
     def write_methods(self):
         """
@@ -220,13 +387,30 @@ class Module(object):
         :rtype: bytes
         """
 
-        b_array = bytearray()
-        for key, vm_token in self.all_vm_tokens.items():
+        nop = VMOp.NOP
+        tokens = self.all_vm_tokens.values()
+
+        # size the script first, so it is written into a single buffer
+        size = len(tokens)
+        for vm_token in tokens:
+            if vm_token.data is not None and vm_token.vm_op != nop:
+                size += len(vm_token.data)
 
-            b_array.append(vm_token.out_op)
+        b_array = bytearray(size)
+        view = memoryview(b_array)
+        offset = 0
 
-            if vm_token.data is not None and vm_token.vm_op != VMOp.NOP:
-                b_array = b_array + vm_token.data
+        for vm_token in tokens:
+            op = vm_token.vm_op
+            b_array[offset] = op[0] if type(op) is bytes else vm_token.out_op
+            offset += 1
+
+            if vm_token.data is not None and op != nop:
+                end = offset + len(vm_token.data)
+                view[offset:end] = vm_token.data
+                offset = end
+
+        view.release()
 
 #        self.to_s()
         return b_array
@@ -236,48 +420,157 @@ class Module(object):
         Perform linkage of addresses between methods.
         """
 
-        from ..compiler import Compiler
+        with self.context.stats.phase('link'):
+            self._link_methods()
+
+    def _link_methods(self):
+
+        stats = self.context.stats
 
         for method in self.methods:
             method.prepare()
 
-        self.all_vm_tokens = OrderedDict()
+        emitted = [method for method in self.orderered_methods if not method.is_interop]
+
+        # check the frame each method creates, as emitted, against the locals it has and uses
+        for method in emitted:
+            size = method.tokenizer.emitted_frame_size()
+            highest = max((push_value(vmtoken) for vmtoken, name in method.tokenizer.frame_slots), default=-1)
+            if size is None or size != len(method.scope) or highest >= size:
+                raise Exception("The frame of method %s holds %s locals, but it has %s and uses up to slot %s" % (
+                    method.full_name, size, len(method.scope), highest))
+
+        if self.context.lean:
+            for module in self.context.modules:
+                module.release()
+
+        # the calls between methods, and the method each of them leads to
+        calls = []
+        for method in emitted:
+            for vmtoken in method.tokenizer.relocations:
+                target_method = self.method_by_name(vmtoken.target_method)
+                if not target_method:
+                    raise Exception("Target method %s not found" % vmtoken.target_method)
+                calls.append((method, vmtoken.addr, vmtoken, target_method))
+
+        trampolines = self._relax_calls(emitted, calls)
+
+        self.all_vm_tokens = {}
 
         address = 0
 
-        for method in self.orderered_methods:
+        for index, method in enumerate(emitted):
+            #                print("ADDING METHOD %s " % method.full_name)
+            for key, vmtoken in method.vm_tokens.items():
+                self.all_vm_tokens[address] = vmtoken
+                address += 1
 
-            if not method.is_interop:
-                #                print("ADDING METHOD %s " % method.full_name)
-                method.address = address
+                if vmtoken.data is not None and vmtoken.vm_op != VMOp.NOP:
+                    address += len(vmtoken.data)
 
-                for key, vmtoken in method.vm_tokens.items():
-                    self.all_vm_tokens[address] = vmtoken
-                    address += 1
+                vmtoken.addr = vmtoken.addr + method.address
 
-                    if vmtoken.data is not None and vmtoken.vm_op != VMOp.NOP:
-                        address += len(vmtoken.data)
+            instructions = method.instruction_count
+            stats.add_method(method.full_name, instructions, len(method.vm_tokens), address - method.address)
+            stats.count('methods')
+            stats.count('instructions', instructions)
+            stats.count('vm_tokens', len(method.vm_tokens))
 
-                    vmtoken.addr = vmtoken.addr + method.address
+            for vmtoken in trampolines[index]:
+                self.all_vm_tokens[address] = vmtoken
+                address += 3
 
-        for key, vmtoken in self.all_vm_tokens.items():
-            if vmtoken.src_method is not None:
+        stats.count('trampolines', sum(len(island) for island in trampolines))
 
-                target_method = self.method_by_name(vmtoken.target_method)
-                if target_method:
-                    jump_len = target_method.address - vmtoken.addr
+    def _relax_calls(self, emitted, calls):
+        """
+        Assign an address to each method and fill in the offset of every call between methods.
 
-                    param_ret_counts = bytearray()
-                    if Compiler.instance().nep8:
-                        param_ret_counts = vmtoken.data[0:2]
-                        jump_len -= 2
+        An offset is a signed 2 byte value, so a call to a method more than 32KB away is routed
+        through trampolines: unconditional jumps placed after the ``RET`` of a method, where they
+        are never run into, each within range of the one before. As long as every method fits
+        in 32KB, a contract of any size can be linked.
 
-                    if jump_len > -32767 and jump_len < 32767:
-                        vmtoken.data = param_ret_counts + jump_len.to_bytes(2, 'little', signed=True)
-                    else:
-                        vmtoken.data = param_ret_counts + jump_len.to_bytes(4, 'little', signed=True)
-                else:
-                    raise Exception("Target method %s not found" % vmtoken.target_method)
+        :param emitted: the methods to write, in order
+        :param calls: a list of ``(method, address in method, vmtoken, target method)`` tuples
+        :return: the trampolines placed after each method
+        :rtype: list
+        """
+        call_offset = 2 if self.context.nep8 else 0
+        sizes = []
+
+        for method in emitted:
+            size = 0
+            for vmtoken in method.vm_tokens.values():
+                size += 1
+                if vmtoken.data is not None and vmtoken.vm_op != VMOp.NOP:
+                    size += len(vmtoken.data)
+            sizes.append(size)
+
+        trampolines = [[] for _ in emitted]
+        by_target = {}
+
+        # each branch is a list of [vmtoken, method or None for a trampoline, address in method,
+        # next stop, target method]
+        branches = [[vmtoken, method, relative, target_method, target_method]
+                    for method, relative, vmtoken, target_method in calls]
+
+        def source_of(branch):
+            return branch[1].address + branch[2] if branch[1] is not None else branch[0].addr
+
+        def offset_of(branch):
+            stop = branch[3]
+            destination = stop.address if isinstance(stop, BoaMethod) else stop.addr
+            return destination - source_of(branch) - (call_offset if branch[1] is not None else 0)
+
+        for _ in range(MAX_RELAX_PASSES):
+            address = 0
+            islands = []
+            for index, method in enumerate(emitted):
+                method.address = address
+                address += sizes[index]
+                for vmtoken in trampolines[index]:
+                    vmtoken.addr = address
+                    address += 3
+                islands.append(address)
+
+            far = [branch for branch in branches if not MIN_JUMP_OFFSET <= offset_of(branch) <= MAX_JUMP_OFFSET]
+            if not far:
+                break
+
+            for branch in far:
+                source = source_of(branch)
+                destination = branch[4].address
+
+                # the reachable island closest to the target method
+                reachable = [index for index, island in enumerate(islands)
+                             if abs(island - source) <= MAX_JUMP_OFFSET - RELAX_MARGIN]
+                index = min(reachable, key=lambda i: abs(destination - islands[i]), default=None)
+                if index is None or abs(destination - islands[index]) >= abs(destination - source):
+                    raise Exception("Call to method %s at %s bytes is out of range, and there is no room for a "
+                                    "trampoline in between" % (branch[4].full_name, destination - source))
+
+                trampoline = by_target.get((index, branch[4]))
+                if trampoline is None:
+                    trampoline = VMToken(vm_op=VMOp.JMP, data=bytearray(2))
+                    trampoline.target_method = branch[4].full_name
+                    trampolines[index].append(trampoline)
+                    by_target[(index, branch[4])] = trampoline
+                    branches.append([trampoline, None, None, branch[4], branch[4]])
+                branch[3] = trampoline
+        else:
+            raise Exception("Could not place the calls between methods within range")
+
+        for branch in branches:
+            vmtoken = branch[0]
+            jump_len = offset_of(branch)
+            if branch[1] is None:
+                vmtoken.data = jump_len.to_bytes(2, 'little', signed=True)
+            else:
+                param_ret_counts = vmtoken.data[0:2] if self.context.nep8 else bytearray()
+                vmtoken.data = param_ret_counts + jump_len.to_bytes(2, 'little', signed=True)
+
+        return trampolines
 
     def to_s(self):
         """
@@ -0,0 +1,552 @@
+"""
+Optimization passes over the VM tokens of each method.
+
+Once a method is tokenized and its jumps resolved, the ``PassManager`` of the compilation runs the
+passes enabled at its optimization level over the tokens of the method, before the methods are
+linked. A pass edits a ``TokenStream``, which keeps the target of every jump while tokens are
+removed or replaced, and re-encodes the jumps once the pass is done. Each token keeps its
+``PyToken``, so the debug map still attributes every remaining token to its line.
+
+The levels are:
+
+- ``O0``: no optimizations, the tokens are written as they were emitted
+- ``O1``: optimizations that only remove work, such as threading jumps and the peephole pass, the default
+- ``O2``: also optimizations that change how the locals of a method are stored
+
+.. code-block:: python
+
+    from boa.compiler import Compiler
+
+    compiler = Compiler.load('path/to/your/file.py', optimize=2)
+    compiler.write()
+
+    print(compiler.stats.optimizations)
+"""
+from boa.code.vmtoken import VMToken, MIN_JUMP_OFFSET, MAX_JUMP_OFFSET, push_value
+from boa.interop import VMOp
+
+O0 = 0
+O1 = 1
+O2 = 2
+
+DEFAULT_LEVEL = O1
+
+# the operations whose 2 byte data is an offset to another token of the same method
+BRANCH_OPS = [ord(op) for op in [VMOp.JMP, VMOp.JMPIF, VMOp.JMPIFNOT, VMOp.CALL]]
+
+NOP = ord(VMOp.NOP)
+JMP = ord(VMOp.JMP)
+PUSH0 = ord(VMOp.PUSH0)
+PUSH1 = ord(VMOp.PUSH1)
+PUSH2 = ord(VMOp.PUSH2)
+PUSH16 = ord(VMOp.PUSH16)
+PUSHBYTES75 = ord(VMOp.PUSHBYTES75)
+
+# the price of an operation in units of 0.001 GAS, as charged by the NEO 2 ``ApplicationEngine``.
+# Pushing constants and NOP are free, ``SYSCALL`` depends on the call and is counted as 1
+OP_PRICES = {
+    ord(VMOp.APPCALL): 10,
+    ord(VMOp.TAILCALL): 10,
+    ord(VMOp.SHA1): 10,
+    ord(VMOp.SHA256): 10,
+    ord(VMOp.HASH160): 20,
+    ord(VMOp.HASH256): 20,
+    ord(VMOp.CHECKSIG): 100,
+    ord(VMOp.VERIFY): 100,
+    ord(VMOp.CHECKMULTISIG): 100,
+}
+
+# the passes run by a ``PassManager``, in order, see ``register``
+PASSES = []
+
+
+def register(pass_class):
+    """
+    Add an optimization pass to the ones every ``PassManager`` runs. Can be used as a class decorator.
+
+    :param pass_class: a subclass of ``OptimizationPass``
+    :return: `pass_class`
+    """
+    PASSES.append(pass_class)
+    return pass_class
+
+
+def op_price(op):
+    """
+    :param op: an operation, as an int
+    :return: the price of running the operation once, in units of 0.001 GAS
+    :rtype: int
+    """
+    if op <= NOP:
+        return 0
+    return OP_PRICES.get(op, 1)
+
+
+def token_size(vmtoken):
+    """
+    :return: the number of bytes `vmtoken` is written as
+    :rtype: int
+    """
+    if vmtoken.data is not None and vmtoken.vm_op != VMOp.NOP:
+        return 1 + len(vmtoken.data)
+    return 1
+
+
+def is_branch(vmtoken):
+    """
+    Check whether a token jumps to another token of its method. Calls to other methods are
+    resolved when linking and are not branches.
+    """
+    return vmtoken.out_op in BRANCH_OPS and vmtoken.target_method is None and \
+        isinstance(vmtoken.data, (bytes, bytearray)) and len(vmtoken.data) == 2
+
+
+class TokenStream(object):
+    """
+    The tokens of a single method, in order, with the token each branch of the method jumps to,
+    and the branches jumping to each token.
+    """
+
+    # the target of a branch jumping to the end of the method
+    END = object()
+
+    method = None
+
+    tokens = None
+
+    targets = None
+
+    valid = True
+
+    # the branches jumping to each token, or to ``END``
+    _branches = None
+
+    # the pytoken of the label each branch jumped to, whose ``jump_from_addr`` it sets
+    _labels = None
+
+    _replaced = None
+
+    def __init__(self, method):
+        """
+        :param method: the tokenized method
+        """
+        self.method = method
+        self.tokens = sorted(method.vm_tokens.values(), key=lambda vmtoken: vmtoken.addr)
+        self.targets = {}
+        self.valid = True
+        self._branches = {}
+        self._labels = {}
+        self._replaced = {}
+
+        by_addr = {vmtoken.addr: vmtoken for vmtoken in self.tokens}
+        end = self.tokens[-1].addr + token_size(self.tokens[-1]) if self.tokens else 0
+
+        for vmtoken in self.tokens:
+            if is_branch(vmtoken):
+                address = vmtoken.addr + int.from_bytes(vmtoken.data, 'little', signed=True)
+                target = TokenStream.END if address == end else by_addr.get(address)
+                if target is None:
+                    # a jump into the middle of a token, leave the method as it is
+                    self.valid = False
+                    self.targets[vmtoken] = None
+                    continue
+                self._link(vmtoken, target)
+                if target is not TokenStream.END and target.pytoken is not None and \
+                        target.pytoken.jump_from_addr is not None:
+                    self._labels[vmtoken] = target.pytoken
+
+    @property
+    def size(self):
+        return sum(token_size(vmtoken) for vmtoken in self.tokens)
+
+    @property
+    def price(self):
+        return sum(op_price(vmtoken.out_op) for vmtoken in self.tokens)
+
+    def target(self, branch):
+        """
+        :return: the token `branch` jumps to, or ``TokenStream.END``
+        """
+        return self.targets[branch]
+
+    def is_target(self, vmtoken):
+        """
+        :return: True if a branch of the method jumps to `vmtoken`
+        """
+        return bool(self._branches.get(vmtoken))
+
+    def replace(self, start, end, new_tokens=()):
+        """
+        Replace the tokens from index `start` up to `end` with `new_tokens`.
+
+        Branches to any of the replaced tokens jump to the first new token, or to the token after
+        them if there are none, so the replaced tokens must do together what the new ones do.
+        A call to another method can not be replaced.
+
+        :param start: the index of the first token to replace
+        :param end: the index after the last token to replace
+        :param new_tokens: the tokens to put in their place
+        """
+        replaced = self.tokens[start:end]
+        if any(vmtoken.target_method is not None for vmtoken in replaced):
+            raise ValueError('A call to another method can not be replaced')
+
+        new_tokens = list(new_tokens)
+        if new_tokens:
+            following = new_tokens[0]
+        else:
+            following = self.tokens[end] if end < len(self.tokens) else TokenStream.END
+
+        for vmtoken in replaced:
+            if vmtoken in self.targets:
+                self._unlink(vmtoken)
+                self._labels.pop(vmtoken, None)
+
+        for vmtoken in replaced:
+            if vmtoken is not following:
+                for branch in self._branches.pop(vmtoken, ()):
+                    self._link(branch, following)
+                self._replaced[vmtoken] = following
+
+        self.tokens[start:end] = new_tokens
+
+        for vmtoken in new_tokens:
+            if is_branch(vmtoken) and vmtoken not in self.targets:
+                raise ValueError('A new branch needs a target, see retarget')
+
+    def remove(self, start, end=None):
+        """
+        Remove the tokens from index `start` up to `end`, or only the token at `start`.
+        """
+        self.replace(start, start + 1 if end is None else end)
+
+    def retarget(self, branch, target):
+        """
+        Set the token a branch jumps to.
+
+        :param branch: a branch in the stream
+        :param target: a token in the stream, or ``TokenStream.END``
+        """
+        if branch in self.targets:
+            self._unlink(branch)
+        self._link(branch, self._resolve(target))
+
+    def _link(self, branch, target):
+        self.targets[branch] = target
+        self._branches.setdefault(target, set()).add(branch)
+
+    def _unlink(self, branch):
+        target = self.targets.pop(branch)
+        branches = self._branches.get(target)
+        if branches is not None:
+            branches.discard(branch)
+
+    def _resolve(self, target):
+        """
+        :return: the token that took the place of `target`, if it was replaced or removed
+        """
+        while target in self._replaced:
+            target = self._replaced[target]
+        return target
+
+    def commit(self):
+        """
+        Give the tokens their new addresses and encode the offset of every branch again, along with
+        the addresses the pytokens of the branches and of their labels record.
+        """
+        self._replaced = {}
+
+        address = 0
+        for vmtoken in self.tokens:
+            vmtoken.addr = address
+            address += token_size(vmtoken)
+        end = address
+
+        for branch, target in self.targets.items():
+            offset = (end if target is TokenStream.END else target.addr) - branch.addr
+            if offset < MIN_JUMP_OFFSET or offset > MAX_JUMP_OFFSET:
+                raise Exception("Jump of %s bytes in method %s is out of range" % (offset, self.method.full_name))
+            branch.data = offset.to_bytes(2, 'little', signed=True)
+            if branch.pytoken is not None and branch.pytoken.jump_to_addr is not None:
+                branch.pytoken.jump_to_addr = end if target is TokenStream.END else target.addr
+
+        # as when jumps are converted, a label jumped to from several places records the last of them
+        for branch in sorted(self._labels, key=lambda vmtoken: vmtoken.addr):
+            self._labels[branch].jump_from_addr = branch.addr
+
+        tokenizer = self.method.tokenizer
+        tokenizer.vm_tokens = {vmtoken.addr: vmtoken for vmtoken in self.tokens}
+        tokenizer._address = end
+
+
+class OptimizationPass(object):
+    """
+    A change to the tokens of a method that keeps what the method does.
+
+    Subclasses set the ``name`` of the pass and the lowest ``level`` it is run at, and edit the
+    stream in ``run``. Registered passes are run by every ``PassManager``:
+
+    .. code-block:: python
+
+        from boa.code.optimize import OptimizationPass, register
+        from boa.interop import VMOp
+
+        @register
+        class RemoveNops(OptimizationPass):
+            name = 'remove_nops'
+
+            def run(self, stream):
+                for index in reversed(range(len(stream.tokens))):
+                    if stream.tokens[index].vm_op == VMOp.NOP:
+                        stream.remove(index)
+    """
+
+    name = None
+
+    level = O1
+
+    def run(self, stream):
+        """
+        Change the tokens of a single method.
+
+        :param stream: the ``TokenStream`` of the method
+        """
+        raise NotImplementedError()
+
+
+class PassManager(object):
+    """
+    Run the optimization passes of a level over the tokens of each method.
+    """
+
+    level = DEFAULT_LEVEL
+
+    passes = None
+
+    def __init__(self, level=DEFAULT_LEVEL, passes=None):
+        """
+        :param level: the optimization level, ``O0``, ``O1`` or ``O2``
+        :param passes: Optional list of ``OptimizationPass`` classes, defaults to the registered ones
+        """
+        if level not in (O0, O1, O2):
+            raise ValueError('Unknown optimization level %s' % level)
+
+        self.level = level
+        self.passes = [pass_class() for pass_class in (PASSES if passes is None else passes)
+                       if pass_class.level <= level]
+
+    def run(self, method):
+        """
+        Optimize the tokens of a method, once its jumps are resolved and before it is linked. What
+        each pass saved is recorded in the ``CompileStats`` of the compilation.
+
+        :param method: the tokenized method
+        :return: the number of bytes saved
+        :rtype: int
+        """
+        if not self.passes or method.is_interop or not method.vm_tokens:
+            return 0
+
+        stream = TokenStream(method)
+        if not stream.valid:
+            return 0
+
+        start = stream.size
+        for optimization in self.passes:
+            size, price = stream.size, stream.price
+            optimization.run(stream)
+            stream.commit()
+
+            method.module.context.stats.add_optimization(optimization.name, size - stream.size, price - stream.price)
+
+        return start - stream.size
+
+
+@register
+class JumpThreadingPass(OptimizationPass):
+    """
+    Point each jump whose target is an unconditional jump, or ``NOP`` followed by one, to where that
+    jump leads, so that a chain of jumps is followed once here rather than on every run. The number
+    of jumps pointed to a new target is counted as ``threaded_jumps`` in the stats.
+    """
+
+    name = 'thread_jumps'
+
+    level = O1
+
+    JUMPS = [JMP, ord(VMOp.JMPIF), ord(VMOp.JMPIFNOT)]
+
+    def run(self, stream):
+        tokens = stream.tokens
+        positions = {vmtoken: index for index, vmtoken in enumerate(tokens)}
+        end = tokens[-1].addr + token_size(tokens[-1])
+        threaded = 0
+
+        for branch in [vmtoken for vmtoken in tokens if vmtoken.out_op in self.JUMPS and is_branch(vmtoken)]:
+            target = current = stream.target(branch)
+            seen = {branch}
+
+            while current is not TokenStream.END and current not in seen:
+                seen.add(current)
+                if current.out_op == NOP and current.data is None:
+                    index = positions[current] + 1
+                    current = tokens[index] if index < len(tokens) else TokenStream.END
+                elif current.out_op == JMP and is_branch(current):
+                    current = target = stream.target(current)
+                else:
+                    break
+
+            offset = (end if target is TokenStream.END else target.addr) - branch.addr
+            if target is not stream.target(branch) and MIN_JUMP_OFFSET <= offset <= MAX_JUMP_OFFSET:
+                stream.retarget(branch, target)
+                threaded += 1
+
+        stream.method.module.context.stats.count('threaded_jumps', threaded)
+
+
+@register
+class StackLocalsPass(OptimizationPass):
+    """
+    Keep locals that are only used right after they are stored on the evaluation stack, instead of
+    in the frame array of the method.
+
+    Reading a local, ``DUPFROMALTSTACK PUSH i PICKITEM``, and storing it, ``DUPFROMALTSTACK PUSH i
+    PUSH2 ROLL SETITEM``, run eight operations for ``x = ...`` followed by a use of ``x``. For each
+    store followed right away by a load of the same local:
+
+    - if the local is not read anywhere else, the value stays on the stack and both are removed
+    - otherwise the value is duplicated with ``DUP`` and only stored
+
+    A store whose value is never read is replaced with ``DROP``. Methods that use their frame array
+    in any other way are left as they are.
+    """
+
+    name = 'stack_locals'
+
+    level = O2
+
+    LOAD = [ord(VMOp.DUPFROMALTSTACK), None, ord(VMOp.PICKITEM)]
+    STORE = [ord(VMOp.DUPFROMALTSTACK), None, PUSH2, ord(VMOp.ROLL), ord(VMOp.SETITEM)]
+
+    def run(self, stream):
+        accesses = self.find_accesses(stream.tokens)
+        if accesses is None:
+            return
+
+        loads = {}
+        for index, is_store, slot in accesses:
+            if not is_store:
+                loads.setdefault(slot, []).append(index)
+
+        # the stores followed right away by a load of the same local, which can be entered
+        # only at the store. Each token is looked up in the branches jumping to it of the stream
+        end = len(self.STORE) + len(self.LOAD)
+        pairs = {}
+        for (index, is_store, slot), following in zip(accesses, accesses[1:]):
+            if is_store and not following[1] and following[2] == slot and following[0] == index + len(self.STORE) \
+                    and not any(stream.is_target(vmtoken) for vmtoken in stream.tokens[index + 1:index + end]):
+                pairs[index] = slot
+
+        # the locals only ever read right after they are stored
+        on_stack = set(slot for slot in set(slot for _, _, slot in accesses)
+                       if all(load - len(self.STORE) in pairs for load in loads.get(slot, [])))
+
+        # edit from the end, so the indexes of the accesses before stay valid
+        for index, is_store, slot in reversed(accesses):
+            if not is_store:
+                continue
+
+            store = stream.tokens[index:index + len(self.STORE)]
+
+            if slot in on_stack:
+                end = index + len(self.STORE) + (len(self.LOAD) if index in pairs else 0)
+                new_tokens = [] if index in pairs else [VMToken(VMOp.DROP, store[0].pytoken)]
+                stream.replace(index, end, new_tokens)
+            elif index in pairs:
+                stream.replace(index, index + len(self.STORE) + len(self.LOAD),
+                               [VMToken(VMOp.DUP, store[0].pytoken)] + store)
+
+    def find_accesses(self, tokens):
+        """
+        Find every read and store of a local.
+
+        :return: a list of ``(index, is_store, slot)`` tuples, in order, or None if the frame array
+            is used in any other way
+        """
+        accesses = []
+
+        for index, vmtoken in enumerate(tokens):
+            if vmtoken.out_op != self.LOAD[0]:
+                continue
+
+            slot = push_value(tokens[index + 1]) if index + 1 < len(tokens) else None
+            if slot is None:
+                return None
+
+            if self._matches(tokens, index, self.LOAD):
+                accesses.append((index, False, slot))
+            elif self._matches(tokens, index, self.STORE):
+                accesses.append((index, True, slot))
+            else:
+                return None
+
+        return accesses
+
+    @staticmethod
+    def _matches(tokens, index, pattern):
+        if index + len(pattern) > len(tokens):
+            return False
+        return all(op is None or tokens[index + offset].out_op == op for offset, op in enumerate(pattern))
+
+
+@register
+class PeepholePass(OptimizationPass):
+    """
+    Remove tokens that do nothing: the ``NOP`` after each ``SYSCALL`` and those emitted for labels,
+    loops and ``EXTENDED_ARG``, jumps to the next token, and pairs that undo each other, such as
+    ``SWAP SWAP``, ``DUP DROP`` and a push followed by ``DROP``.
+
+    The ``NOP`` of a ``breakpoint()`` is kept, as is a ``NOP`` ending a method, since a jump to it
+    can not be moved past the end of the method.
+    """
+
+    name = 'peephole'
+
+    level = O1
+
+    # the pairs of operations that leave the stack as it was, apart from pushes followed by DROP
+    PAIRS = [(ord(VMOp.SWAP), ord(VMOp.SWAP)), (ord(VMOp.DUP), ord(VMOp.DROP))]
+
+    DROP = ord(VMOp.DROP)
+
+    def run(self, stream):
+        tokens = stream.tokens
+        index = 0
+
+        while index < len(tokens):
+            vmtoken = tokens[index]
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+
+            if following is None:
+                break
+
+            if vmtoken.out_op == NOP and not (vmtoken.pytoken is not None and vmtoken.pytoken.is_breakpoint):
+                stream.remove(index)
+            elif vmtoken.out_op == JMP and is_branch(vmtoken) and stream.target(vmtoken) is following:
+                stream.remove(index)
+            elif self.is_pair(vmtoken, following) and not stream.is_target(following):
+                stream.remove(index, index + 2)
+            else:
+                index += 1
+                continue
+
+            # what came before may now pair with what follows
+            index = max(index - 1, 0)
+
+    def is_pair(self, first, second):
+        """
+        :return: True if running `first` then `second` leaves the stack as it was
+        """
+        if second.out_op == self.DROP and first.out_op <= PUSH16 and first.target_method is None:
+            return True
+        return (first.out_op, second.out_op) in self.PAIRS
@@ -1,31 +1,36 @@
 from bytecode import Instr, UNSET, Compare, Label
 from boa.interop import VMOp
 from boa.code import pyop
-from logzero import logger
 import opcode
 
 
-class PyToken():
+class DebugToken(object):
+    """
+    What the debug map needs to know of a ``PyToken``.
 
-    instruction = None  # type:Instr
-    expression = None
-    index = 0
+    Lean compiles put one in place of each ``PyToken`` once its method is tokenized, so that the
+    instructions and expressions it refers to can be freed.
+    """
 
-    jump_found = False
+    __slots__ = ['file', 'lineno', 'method_name', 'method_lineno', 'is_breakpoint']
 
-    jump_target = None
-    jump_from = None
-    jump_from_addr = None
-    jump_to_addr = None
+    def __init__(self, pytoken):
+        self.file = pytoken.file
+        self.lineno = pytoken.lineno
+        self.method_name = pytoken.method_name
+        self.method_lineno = pytoken.method_lineno
+        self.is_breakpoint = pytoken.is_breakpoint
 
-    is_dynamic_appcall = False
 
-    _methodname = None
+class PyToken():
 
-    is_breakpoint = False
+    # one token is made for every instruction of the contract, so keep them small
+    __slots__ = ['instruction', 'expression', 'index', 'jump_found', 'jump_target', 'jump_from',
+                 'jump_from_addr', 'jump_to_addr', 'is_dynamic_appcall', '_methodname', 'is_breakpoint',
+                 'is_sys_call']
 
     def __init__(self, instruction, expression, index, fallback_ln):
-        self.instruction = instruction
+        self.instruction = instruction  # type:Instr
         self.expression = expression
         self.index = index
         self._methodname = None
@@ -34,6 +39,9 @@ class PyToken():
         self.jump_found = False
         self.jump_from_addr = None
         self.jump_to_addr = None
+        self.is_dynamic_appcall = False
+        self.is_breakpoint = False
+        self.is_sys_call = None
         # self.jump_to_addr_abs = None
         # self.jump_from_addr_abs = None
 
@@ -59,9 +67,8 @@ class PyToken():
     def file(self):
         try:
             return self.expression.container_method.module.path
-        except Exception as e:
-            print("Could not get file %s " % e)
-        return None
+        except AttributeError:
+            return None
 
     @property
     def method_lineno(self):
@@ -312,4 +319,6 @@ class PyToken():
         else:
             #            import pdb
             #            pdb.set_trace()
-            logger.warning("Op Not Converted %s %s %s %s %s" % (self.instruction.arg, self.instruction.name, self.method_name, self.lineno, self.method_lineno))
+            tokenizer.method.module.context.diagnostics.warning(
+                'op_not_converted', 'Op Not Converted %s %s', self.instruction.arg, self.instruction.name,
+                path=self.file, lineno=self.method_lineno + self.lineno, method=self.method_name)
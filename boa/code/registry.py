@@ -0,0 +1,237 @@
+from bytecode import Bytecode, ControlFlowGraph, Instr
+from boa.code.ast_lower import CompiledExpressions
+from boa.code.ast_preprocess import preprocess_module
+from boa.code.imports import ImportResolver
+from boa.code.stats import CompileStats
+from collections import OrderedDict
+from importlib.util import decode_source
+import ast
+import hashlib
+import inspect
+import io
+import os
+import threading
+
+
+class ParsedModule(object):
+    """
+    The result of parsing a single Python file.
+
+    Nothing in here is changed once it has been parsed, so the same ``ParsedModule`` can be
+    shared by every ``Module`` created for the file, in any number of compilations.
+    """
+
+    path = None
+
+    lines = None
+
+    # the sha256 hex digest of the source parsed, as ``boa.cache.CompileCache.hash_file`` computes it
+    digest = None
+
+    bc = None
+    cfg = None
+
+    _dictionary_defs = None
+    _method_bodies = None
+    _method_sources = None
+
+    def __init__(self, path, source=None, stats=None):
+        """
+        Parse a Python file.
+
+        :param path: the path of the file, or the name to use for it if `source` is given
+        :param source: Optional source text (or bytes) to parse instead of reading the file
+        :param stats: Optional ``boa.code.stats.CompileStats`` to record the time spent parsing
+        """
+        self.path = path
+        self._method_bodies = {}
+        self._method_sources = {}
+
+        if stats is None:
+            stats = CompileStats()
+
+        if source is None:
+            with open(path, 'rb') as f:
+                source = f.read()
+        self.digest = hashlib.sha256(source.encode('utf-8') if isinstance(source, str) else source).hexdigest()
+        if isinstance(source, bytes):
+            source = decode_source(source)
+
+        self.lines = io.StringIO(source).readlines()
+
+        # parse the file once, and rewrite the dictionaries of its functions before compiling it,
+        # so the functions do not have to be parsed and compiled again on their own
+        with stats.phase('parse'):
+            tree = ast.parse(source, path)
+        with stats.phase('preprocess'):
+            self._dictionary_defs = preprocess_module(tree)
+        with stats.phase('compile'):
+            compiled_source = compile(tree, path, 'exec')
+
+        with stats.phase('bytecode'):
+            self.bc = Bytecode.from_code(compiled_source)
+        with stats.phase('cfg'):
+            self.cfg = ControlFlowGraph.from_bytecode(self.bc)
+
+        # split the blocks so that each block holds a single line
+        with stats.phase('split_blocks'):
+            for block in self.cfg:
+                start_ln = block[0].lineno
+                for index, instr in enumerate(block):
+                    if instr.lineno != start_ln:
+                        self.cfg.split_block(block, index)
+
+    def method_body(self, code_object, stats=None):
+        """
+        Retrieve the body of a function defined in this file.
+
+        The line numbers of the instructions are relative to the first line of the function.
+
+        :param code_object: the code object of the function
+        :param stats: Optional ``boa.code.stats.CompileStats`` to record the time spent
+        :return: a tuple of the code object, the dictionary definitions and the ``Bytecode``
+        """
+        body = self._method_bodies.get(code_object)
+        if body is None:
+            if stats is None:
+                stats = CompileStats()
+            with stats.phase('bytecode'):
+                bytecode = Bytecode.from_code(code_object)
+
+            offset = code_object.co_firstlineno - 1
+            bytecode.first_lineno -= offset
+            for instr in bytecode:
+                if isinstance(instr, Instr):
+                    instr.lineno -= offset
+
+            dictionary_defs = self._dictionary_defs.get((code_object.co_name, code_object.co_firstlineno), [])
+            body = (code_object, dictionary_defs, bytecode)
+            self._method_bodies[code_object] = body
+        return body
+
+    def method_source(self, code_object):
+        """
+        Retrieve the source text of a function defined in this file.
+
+        :param code_object: the code object of the function
+        :return: the lines of the function
+        :rtype: str
+        """
+        source = self._method_sources.get(code_object)
+        if source is None:
+            source = ''.join(inspect.getblock(self.lines[code_object.co_firstlineno - 1:]))
+            self._method_sources[code_object] = source
+        return source
+
+
+class ModuleRegistry(object):
+    """
+    A cache of parsed Python files, keyed by resolved file path and modification time.
+
+    Every compilation has a registry, so a file imported by several modules is only parsed once.
+    To also reuse the parsed files across compilations, pass the same registry to each of them:
+
+    .. code-block:: python
+
+        from boa.code.registry import ModuleRegistry
+        from boa.compiler import Compiler
+
+        registry = ModuleRegistry()
+
+        Compiler.load('path/to/a.py', registry=registry)
+        Compiler.load('path/to/b.py', registry=registry)
+
+    The registry also holds the ``boa.code.imports.ImportResolver`` that finds the file of each
+    imported module, and the ``boa.code.ast_lower.CompiledExpressions`` of the expressions
+    compiled while tokenizing, so that those are reused along with the parsed files.
+
+    A registry may be shared between threads. A registry kept for a long time, such as the one of
+    ``boa.daemon``, should be given a ``max_entries``, so that the files used least recently are
+    dropped instead of every file ever parsed being kept.
+    """
+
+    hits = 0
+    misses = 0
+
+    imports = None
+
+    expressions = None
+
+    max_entries = None
+
+    _parsed = None
+    _lock = None
+
+    def __init__(self, search_path=None, max_entries=None):
+        """
+        :param search_path: Optional list of directories to search for imported modules, before
+            ``sys.path`` and the directory of the importing file
+        :param max_entries: Optional number of parsed files to keep, the least recently used are dropped first
+        """
+        self.imports = ImportResolver(search_path)
+        self.expressions = CompiledExpressions()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._parsed)
+
+    def parse(self, path, source=None, stats=None):
+        """
+        Retrieve the parsed file at `path`, parsing it if it has not been parsed or has changed since.
+
+        When `source` is given, the file system is not used and `path` is only used as a name.
+
+        :param path: the path of the Python file
+        :param source: Optional source text of the file
+        :param stats: Optional ``boa.code.stats.CompileStats`` to record the time spent parsing
+        :return: the ``ParsedModule`` for the file
+        :rtype: ``boa.code.registry.ParsedModule``
+        """
+        if source is None:
+            key = os.path.realpath(path)
+            stat = os.stat(key)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        else:
+            key = path
+            stamp = hashlib.sha1(source.encode('utf-8') if isinstance(source, str) else source).hexdigest()
+
+        with self._lock:
+            entry = self._parsed.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                self._parsed.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+
+        parsed = ParsedModule(path, source, stats)
+
+        with self._lock:
+            self._parsed[key] = (stamp, parsed)
+            self._parsed.move_to_end(key)
+            while self.max_entries is not None and len(self._parsed) > self.max_entries:
+                self._parsed.popitem(last=False)
+
+        return parsed
+
+    def discard(self, path):
+        """
+        Remove a single parsed file from the registry, if it is in there.
+
+        :param path: the path of the Python file, or the name it was parsed under from source text
+        """
+        with self._lock:
+            self._parsed.pop(path, None)
+            self._parsed.pop(os.path.realpath(path), None)
+
+    def clear(self):
+        """
+        Remove every parsed file from the registry.
+        """
+        with self._lock:
+            self._parsed = OrderedDict()
+        self.imports.clear()
+        self.expressions.clear()
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# ``tracemalloc`` is shared by the whole process. The compilations tracing memory at the same time
+# share it, and the last of them to finish stops it, unless it was started outside of the compiler
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_started = False
+
+
+class CompileStats(object):
+    """
+    Timings and counters collected while compiling a contract.
+
+    The time of each phase is exclusive: when one phase runs inside another, for example a
+    module being built while the module importing it is built, the time is only counted once,
+    for the inner phase. The phases therefore add up to the total time spent compiling.
+    Files reused from a ``ModuleRegistry`` are not parsed again, so they add no time to the
+    parsing phases.
+
+    .. code-block:: python
+
+        from boa.compiler import Compiler
+
+        compiler = Compiler.load('path/to/your/file.py')
+        compiler.write()
+
+        print(compiler.stats.to_json())
+    """
+
+    PHASES = ['parse', 'compile', 'bytecode', 'cfg', 'split_blocks', 'preprocess', 'build',
+              'tokenize', 'convert_jumps', 'optimize', 'link', 'write']
+
+    phases = None
+
+    calls = None
+
+    counters = None
+
+    methods = None
+
+    optimizations = None
+
+    peak_memory = None
+
+    max_rss = None
+
+    trace_memory = False
+
+    _stack = None
+
+    _tracing = False
+
+    def __init__(self, trace_memory=False):
+        """
+        :param trace_memory: measure the peak memory allocated while compiling with ``tracemalloc``,
+            which makes compiling several times slower. Memory is only traced inside ``tracing``
+        """
+        self.phases = OrderedDict((name, 0.0) for name in CompileStats.PHASES)
+        self.calls = OrderedDict((name, 0) for name in CompileStats.PHASES)
+        self.counters = OrderedDict()
+        self.methods = OrderedDict()
+        self.optimizations = OrderedDict()
+        self.peak_memory = None
+        self.max_rss = None
+        self.trace_memory = trace_memory
+        self._stack = []
+        self._tracing = False
+
+    @contextmanager
+    def tracing(self):
+        """
+        Record the peak memory allocated inside the ``with`` block in ``peak_memory``, if the stats
+        were created with `trace_memory`. Tracing stops when the block is left, by an exception too.
+        """
+        global _trace_users, _trace_started
+
+        if not self.trace_memory or self._tracing:
+            yield
+            return
+
+        with _trace_lock:
+            if _trace_users == 0:
+                _trace_started = not tracemalloc.is_tracing()
+                if _trace_started:
+                    tracemalloc.start()
+            _trace_users += 1
+        self._tracing = True
+
+        try:
+            yield
+        finally:
+            self.peak_memory = max(self.peak_memory or 0, tracemalloc.get_traced_memory()[1])
+            self._tracing = False
+            with _trace_lock:
+                _trace_users -= 1
+                if _trace_users == 0 and _trace_started:
+                    tracemalloc.stop()
+                    _trace_started = False
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time the code run inside the ``with`` block as part of the phase `name`.
+
+        :param name: the name of the phase
+        """
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.phases[parent[0]] += now - parent[1]
+
+        entry = [name, now]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + now - entry[1]
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def count(self, name, amount=1):
+        """
+        Add to the counter `name`.
+
+        :param name: the name of the counter
+        :param amount: the amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_method(self, full_name, instructions, tokens, size):
+        """
+        Record the output of a method written to the script.
+
+        :param full_name: the full name of the method
+        :param instructions: the number of Python instructions in the method
+        :param tokens: the number of VM tokens emitted for the method
+        :param size: the number of bytes emitted for the method
+        """
+        self.methods[full_name] = OrderedDict([('instructions', instructions), ('tokens', tokens), ('bytes', size)])
+
+    def add_optimization(self, name, size, gas):
+        """
+        Record what an optimization pass saved on a method.
+
+        :param name: the name of the pass
+        :param size: the number of bytes saved
+        :param gas: the estimated GAS saved when every token runs once, in units of 0.001 GAS
+        """
+        saved = self.optimizations.get(name)
+        if saved is None:
+            saved = self.optimizations[name] = OrderedDict([('bytes', 0), ('gas', 0)])
+        saved['bytes'] += size
+        saved['gas'] += gas
+
+    def finish(self):
+        """
+        Record the memory used by the process. Called once the script has been written.
+        """
+        if resource is not None:
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            self.max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if sys.platform != 'darwin':
+                self.max_rss *= 1024
+
+    @property
+    def total(self):
+        """
+        The total time spent in all phases, in seconds.
+        """
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        """
+        :return: the stats as a dictionary
+        :rtype: dict
+        """
+        data = OrderedDict()
+        data['total'] = self.total
+        data['phases'] = self.phases
+        data['calls'] = self.calls
+        data['counters'] = self.counters
+        data['peak_memory'] = self.peak_memory
+        data['max_rss'] = self.max_rss
+        data['methods'] = self.methods
+        data['optimizations'] = self.optimizations
+        return data
+
+    def to_json(self, indent=4):
+        """
+        :param indent: the indent to use in the output
+        :return: the stats as a json string
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(), indent=indent)
@@ -1,30 +1,22 @@
-from collections import OrderedDict
 from boa.interop import VMOp
 from boa.interop.BigInteger import BigInteger
 from bytecode import Label
 from boa.code.pyop import *
 NEO_SC_FRAMEWORK = 'boa.interop.'
 
+# the range of the signed 2 byte offset of a jump or a call
+MIN_JUMP_OFFSET = -32768
+MAX_JUMP_OFFSET = 32767
+
 
 class VMToken(object):
     """
+    A single opcode of the output, with its data.
 
+    A contract is made of many tokens, so they use ``__slots__`` to stay small.
     """
-    addr = None
-
-    pytoken = None
-
-    data = None
-
-    vm_op = None
-
-    src_method = None
-
-    target_method = None
-
-    is_annotation = None
-
-    updatable_data = None
+    __slots__ = ['addr', 'pytoken', 'data', 'vm_op', 'src_method', 'target_method', 'is_annotation',
+                 'updatable_data']
 
     @property
     def out_op(self):
@@ -50,6 +42,21 @@ class VMToken(object):
         self.target_method = None
 
         self.is_annotation = False
+        self.updatable_data = None
+
+
+def push_value(vmtoken):
+    """
+    :return: the integer pushed by `vmtoken`, or None if it does not push an integer constant
+    """
+    op = vmtoken.out_op
+    if op == ord(VMOp.PUSH0):
+        return 0
+    if ord(VMOp.PUSH1) <= op <= ord(VMOp.PUSH16):
+        return op - ord(VMOp.PUSH1) + 1
+    if op <= ord(VMOp.PUSHBYTES75) and isinstance(vmtoken.data, (bytes, bytearray)) and len(vmtoken.data) == op:
+        return int.from_bytes(vmtoken.data, 'little', signed=True)
+    return None
 
 
 class VMTokenizer(object):
@@ -62,12 +69,26 @@ class VMTokenizer(object):
 
     vm_tokens = None
 
+    # the calls to other methods, whose target address is filled in by ``Module.link_methods``
+    relocations = None
+
+    # the tokens of each label jumped to, used by ``method.convert_jumps``
+    labels = None
+
     total_param_and_body_count_token = None
 
+    # the number of locals the frame array of the method holds
+    frame_size = None
+
+    # the pushes of the position of a local in the frame, with the name of the local
+    frame_slots = None
+
     def __init__(self, method):
         self.method = method
         self._address = 0
-        self.vm_tokens = OrderedDict()
+        self.vm_tokens = {}
+        self.relocations = []
+        self.labels = {}
 
         self.method_begin_items()
 
@@ -77,12 +98,131 @@ class VMTokenizer(object):
         # which is the length of the method `scope` dictionary
         # then create a new array for the vm to store
 
-        self.convert_push_integer(self.method.stacksize)
-        self.convert1(VMOp.NEWARRAY)
+        # the frame is a Struct: on the NEO VM it behaves as an Array would, as it is only read and
+        # written with PICKITEM and SETITEM, never stored in another item nor compared. neo-python,
+        # which runs the tests, finds the arrays it already counted by comparing their items, and
+        # faults when a frame Array is as long as an Array of the contract, but never matches a Struct
+
+        self.frame_size = self.method.stacksize
+        self.frame_slots = []
+
+        if len(self.method.args):
+            # the arguments are already on the stack, so pack them into the frame as they are.
+            # the other locals are pushed in front of them by ``update_frame_size``, unless that
+            # takes more bytes than storing the arguments one by one into an empty frame
+            self.total_param_and_body_count_token = self.convert_push_integer(len(self.method.args))
+            self.convert1(VMOp.PACK)
+            self.convert1(VMOp.NEWSTRUCT)
+            self.convert1(VMOp.TOALTSTACK)
+            return
+
+        self.total_param_and_body_count_token = self.convert_push_integer(self.frame_size)
+        self.convert1(VMOp.NEWSTRUCT)
         self.convert1(VMOp.TOALTSTACK)
 
-        for index, arg in enumerate(self.method.args):
-            self.convert_load_parameter(arg, index)
+    def update_frame_size(self):
+        """
+        Size the frame array created by ``method_begin_items`` for every local of the method,
+        including those added while tokenizing, such as the counters of ``for`` loops.
+
+        When the frame is packed from the arguments, a ``PUSH0`` is added in front of them for
+        every other local, and those locals are moved to the start of the frame, before the
+        arguments. That padding costs a byte per local, while storing an argument into an empty
+        frame costs at least five, so a method with few arguments and many other locals would grow:
+        when the padding is larger than those stores, the frame is created empty instead, and each
+        argument stored into it with ``SETITEM``. Called once the method is tokenized, before its jumps are resolved.
+        """
+        size = self.method.stacksize
+        args = self.method.args
+        tokens = list(self.vm_tokens.values())
+
+        # DUPFROMALTSTACK, PUSH i, PUSH2, ROLL and SETITEM for each argument, the first on top
+        positions = [VMToken(vm_op=VMOp.PUSH0) for name in args]
+        stores = []
+        for index, position in enumerate(positions):
+            self.set_push_integer(position, index)
+            stores += [VMToken(vm_op=VMOp.DUPFROMALTSTACK), position,
+                       VMToken(vm_op=VMOp.PUSH2), VMToken(vm_op=VMOp.ROLL), VMToken(vm_op=VMOp.SETITEM)]
+        stores_length = sum(1 + len(vmtoken.data or b'') for vmtoken in stores)
+
+        # a PUSH0 per other local and the PACK, against the stores
+        if len(args) and size - len(args) + 1 > stores_length:
+            # the arguments already are the first locals of the scope
+            self.frame_slots += zip(positions, args)
+
+            # drop the PACK after the size, and store the arguments after the TOALTSTACK
+            count = tokens.index(self.total_param_and_body_count_token)
+            tokens[count + 4:count + 4] = stores
+            del tokens[count + 1]
+            self.set_push_integer(self.total_param_and_body_count_token, size)
+
+        elif len(args) and size > len(args):
+            scope = self.method.scope
+            names = [name for name in sorted(scope, key=scope.get) if name not in args] + list(args)
+            for index, name in enumerate(names):
+                scope[name] = index
+            for vmtoken, name in self.frame_slots:
+                self.set_push_integer(vmtoken, scope[name])
+
+            tokens[0:0] = [VMToken(vm_op=VMOp.PUSH0) for index in range(size - len(args))]
+            self.set_push_integer(self.total_param_and_body_count_token, size)
+
+        elif not len(args) and size != self.frame_size:
+            self.set_push_integer(self.total_param_and_body_count_token, size)
+
+        self.frame_size = size
+
+        # the pushes changed may no longer have the same length, so lay the tokens out again
+        address = 0
+        for vmtoken in tokens:
+            vmtoken.addr = address
+            address += 1
+            if vmtoken.data is not None and type(vmtoken.data) is not Label:
+                address += len(vmtoken.data)
+
+        self.vm_tokens = {vmtoken.addr: vmtoken for vmtoken in tokens}
+        self._address = address
+
+    def emitted_frame_size(self):
+        """
+        Decode the number of locals the frame created by ``method_begin_items`` holds, from the
+        tokens it emitted: the size pushed before ``NEWSTRUCT``, or, when the frame is packed from
+        the arguments, the ``PUSH0`` padding in front of them followed by the size packed.
+
+        :return: the number of locals, or None if the tokens are not such a prologue
+        """
+        tokens = list(self.vm_tokens.values())
+        count = self.total_param_and_body_count_token
+        index = next((index for index, vmtoken in enumerate(tokens) if vmtoken is count), None)
+        if index is None or index + 1 >= len(tokens):
+            return None
+
+        size = push_value(count)
+        padding = tokens[:index]
+
+        if tokens[index + 1].out_op == ord(VMOp.PACK):
+            if size is None or size < len(padding) or any(push_value(vmtoken) != 0 for vmtoken in padding):
+                return None
+        elif len(padding) or tokens[index + 1].out_op != ord(VMOp.NEWSTRUCT):
+            return None
+
+        return size
+
+    @staticmethod
+    def set_push_integer(vmtoken, i):
+        """
+        Change a token pushing a non negative integer to push `i` instead.
+
+        :param vmtoken: the token to change
+        :param i: the integer to push
+        """
+        if i == 0:
+            vmtoken.vm_op, vmtoken.data = VMOp.PUSH0, None
+        elif i <= 16:
+            vmtoken.vm_op, vmtoken.data = 0x50 + i, None
+        else:
+            data = BigInteger(i).ToByteArray()
+            vmtoken.vm_op, vmtoken.data = len(data), data
 
     def method_end_items(self):
         self.insert1(VMOp.FROMALTSTACK)
@@ -162,7 +302,8 @@ class VMTokenizer(object):
 
         bigint = BigInteger(i)
         outdata = bigint.ToByteArray(signed=False)
-        print("big int %s %s" % (bigint, outdata))
+        self.method.module.context.diagnostics.info('big_int', 'big int %s %s', bigint, outdata,
+                                                    path=self.method.module.path, method=self.method.name)
 
         return self.insert_push_data(outdata)
 
@@ -179,6 +320,9 @@ class VMTokenizer(object):
         vmtoken = VMToken(vm_op=vm_op, addr=start_addr,
                           pytoken=py_token, data=data)
 
+        if py_token is not None and py_token.jump_target is not None:
+            self.labels.setdefault(py_token.jump_target, []).append(vmtoken)
+
         self._address += 1
 
         if vmtoken.data is not None and type(vmtoken.data) is not Label:
@@ -309,7 +453,7 @@ class VMTokenizer(object):
         if local_name in self.method.scope.keys():
             position = self.method.scope[local_name]
 
-            self.convert_push_integer(position)
+            self.frame_slots.append((self.convert_push_integer(position), local_name))
 
             # set item
             self.convert_push_integer(2)
@@ -335,7 +479,7 @@ class VMTokenizer(object):
             self.convert1(VMOp.DUPFROMALTSTACK, py_token=py_token)
 
             # get i
-            self.convert_push_integer(position)
+            self.frame_slots.append((self.convert_push_integer(position), local_name))
             self.convert1(VMOp.PICKITEM)
 
         else:
@@ -346,21 +490,6 @@ class VMTokenizer(object):
         self.convert1(VMOp.ROT)
         self.convert1(VMOp.SETITEM, pytoken)
 
-    def convert_load_parameter(self, arg, position):
-        """
-
-        :param arg:
-        :param position:
-        """
-        # get array
-        self.convert1(VMOp.DUPFROMALTSTACK)
-
-        self.insert_push_integer(position)
-        self.insert_push_integer(2)
-
-        self.insert1(VMOp.ROLL)
-        self.insert1(VMOp.SETITEM)
-
     def convert_built_in_list(self, pytoken):
         """
 
@@ -450,10 +579,8 @@ class VMTokenizer(object):
         # self.insert1(VMOp.NOP)
 
         fname = pytoken.func_name
-        full_name = None
-        for m in self.method.module.methods:
-            if fname == m.name:
-                full_name = m.full_name
+        target = self.method.module.method_named(fname)
+        full_name = target.full_name if target is not None else None
 
         # operational call like len(items) or abs(value)
         if self.is_op_call(fname):
@@ -486,6 +613,7 @@ class VMTokenizer(object):
 
         vmtoken.src_method = self.method
         vmtoken.target_method = pytoken.func_name
+        self.relocations.append(vmtoken)
         return vmtoken
 
     @staticmethod
@@ -786,6 +914,7 @@ class Nep8VMTokenizer(VMTokenizer):
 
         vmtoken.src_method = self.method
         vmtoken.target_method = pytoken.func_name
+        self.relocations.append(vmtoken)
         return vmtoken
 
     def convert_smart_contract_call(self, pytoken, param_len):
@@ -1,5 +1,140 @@
 import os
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from boa.code.context import CompileContext
+from boa.code.diagnostics import WARNING
 from boa.code.module import Module
+from boa.code.optimize import DEFAULT_LEVEL
+from boa.code.registry import ModuleRegistry
+
+
+class Artifacts(object):
+    """
+    The output of compiling a single file with ``Compiler.compile_many`` or ``Compiler.compile_source``.
+
+    If the compilation failed, ``data`` and ``debug_json`` are ``None`` and ``error``
+    holds the reason for the failure.
+    """
+
+    path = None
+
+    data = None
+
+    debug_json = None
+
+    error = None
+
+    stats = None
+
+    _diagnostics = None
+
+    def __init__(self, path, data=None, debug_json=None, error=None, stats=None, diagnostics=None):
+        self.path = path
+        self.data = data
+        self.debug_json = debug_json
+        self.error = error
+        self.stats = stats
+        self._diagnostics = diagnostics
+
+    @property
+    def diagnostics(self):
+        """
+        The error that stopped the compilation, if any, then the warnings and errors recorded while compiling.
+
+        :return: a list of messages
+        :rtype: list
+        """
+        messages = [self.error] if self.error is not None else []
+        if self._diagnostics is not None:
+            messages.extend(str(diagnostic) for diagnostic in self._diagnostics.filter(WARNING))
+        return messages
+
+    @property
+    def success(self):
+        return self.error is None
+
+    @property
+    def debug_map(self):
+        """
+        The debug map as a dictionary.
+
+        :return: the parsed debug map, or None if the compilation failed
+        :rtype: dict
+        """
+        if self.debug_json is None:
+            return None
+        return json.loads(self.debug_json)
+
+    @property
+    def md5(self):
+        """
+        The md5 hex digest of the script, as recorded in the debug map.
+        """
+        if self.data is None:
+            return None
+        return hashlib.md5(self.data).hexdigest()
+
+    @property
+    def script_hash(self):
+        """
+        The script hash of the contract (RIPEMD160 of the SHA256 of the script), as a big endian hex string.
+
+        :return: the script hash, or None if the compilation failed or RIPEMD160 is not available
+        """
+        if self.data is None:
+            return None
+        try:
+            ripemd = hashlib.new('ripemd160', hashlib.sha256(self.data).digest())
+        except ValueError:
+            return None
+        return ripemd.digest()[::-1].hex()
+
+
+_worker_registry = None
+
+
+def _compile_one(path, use_nep8=True, save=False, registry=None, lean=False, optimize=DEFAULT_LEVEL):
+    """
+    Compile a single file for ``Compiler.compile_many``.
+
+    This is a module level function so that it can be sent to a worker process.
+    When no registry is given, the files parsed are shared by every compile run in the worker process.
+
+    :param path: the path of the Python file to compile
+    :param use_nep8: whether to compile with NEP8 stack isolation
+    :param save: whether to write the `.avm` and `.debug.json` files alongside the source
+    :param registry: the ``ModuleRegistry`` to reuse parsed files from
+    :param lean: compile in lean mode, and do not keep the file itself in the registry afterwards
+    :param optimize: the optimization level, see ``boa.code.optimize``
+    :return: the ``Artifacts`` for the file
+    """
+    global _worker_registry
+
+    if registry is None:
+        if _worker_registry is None:
+            _worker_registry = ModuleRegistry()
+        registry = _worker_registry
+
+    try:
+        compiler = Compiler.load(os.path.abspath(path), use_nep8=use_nep8, registry=registry, lean=lean,
+                                 optimize=optimize)
+
+        output_path = Compiler.default_output_path(path)
+        result = compiler.artifacts(os.path.splitext(os.path.basename(output_path))[0])
+        result.path = path
+
+        if save:
+            Compiler.write_file(result.data, output_path)
+            Compiler.write_debug_file(result.debug_json, output_path)
+
+        return result
+    except Exception as e:
+        return Artifacts(path, error='%s: %s' % (type(e).__name__, e))
+    finally:
+        # each contract is compiled once, unlike the files it imports
+        if lean:
+            registry.discard(os.path.abspath(path))
 
 
 class Compiler(object):
@@ -26,23 +161,57 @@ class Compiler(object):
 
     __instance = None
 
-    entry_module = None
+    context = None
 
-    nep8 = True
+    def __init__(self, use_nep8=True, registry=None, resolver=None, trace_memory=False, lean=False,
+                 optimize=DEFAULT_LEVEL):
+        self.context = CompileContext(use_nep8=use_nep8, registry=registry, resolver=resolver,
+                                      trace_memory=trace_memory, lean=lean, optimize=optimize)
 
     @staticmethod
     def instance():
         """
-        Retrieve the current instance of the Compiler object, if it exists,
+        Retrieve the most recently loaded instance of the Compiler object, if it exists,
         or create one.
 
-        :return: the singleton instance of the Compiler object
+        Each call to ``Compiler.load`` creates a new instance with its own compile context,
+        so prefer keeping a reference to the object it returns.
+
+        :return: the current instance of the Compiler object
         """
 
         if not Compiler.__instance:
             Compiler.__instance = Compiler()
         return Compiler.__instance
 
+    @property
+    def entry_module(self):
+        return self.context.entry_module
+
+    @property
+    def nep8(self):
+        return self.context.nep8
+
+    @property
+    def stats(self):
+        """
+        Retrieve the timings and counters collected while compiling.
+
+        :return: the stats of this compilation
+        :rtype: ``boa.code.stats.CompileStats``
+        """
+        return self.context.stats
+
+    @property
+    def diagnostics(self):
+        """
+        Retrieve the messages recorded while compiling, such as operations that could not be converted.
+
+        :return: the diagnostics of this compilation
+        :rtype: ``boa.code.diagnostics.Diagnostics``
+        """
+        return self.context.diagnostics
+
     @property
     def default(self):
         """
@@ -64,6 +233,18 @@ class Compiler(object):
         with open(path, 'wb+') as out_file:
             out_file.write(data)
 
+    @staticmethod
+    def write_debug_file(debug_json, path):
+        """
+        Save the debug map alongside the `.avm` file at the specified path.
+
+        :param debug_json: the debug map json
+        :param path: the path of the `.avm` file
+        """
+
+        with open(path.replace('.avm', '.debug.json'), 'w+') as out_file:
+            out_file.write(debug_json)
+
     def write(self):
         """
         Write the default module to a byte string.
@@ -75,14 +256,33 @@ class Compiler(object):
         out_bytes = bytes(self.entry_module.write())
         return out_bytes
 
+    def artifacts(self, avm_name=None):
+        """
+        Write the default module and generate its debug map, without saving either to disk.
+
+        :param avm_name: the name of the contract recorded in the debug map, defaults to the module file name
+        :return: the compiled program and its debug map
+        :rtype: ``boa.compiler.Artifacts``
+        """
+
+        if avm_name is None:
+            avm_name = os.path.splitext(os.path.basename(self.entry_module.path))[0]
+
+        data = self.write()
+        debug_json = self.entry_module.generate_debug_json(avm_name, hashlib.md5(data).hexdigest())
+
+        return Artifacts(self.entry_module.path, data, debug_json, stats=self.stats, diagnostics=self.diagnostics)
+
     @staticmethod
-    def load_and_save(path, output_path=None, use_nep8=True):
+    def load_and_save(path, output_path=None, use_nep8=True, cache=None, optimize=DEFAULT_LEVEL):
         """
         Call `load_and_save` to load a Python file to be compiled to the .avm format and save the result.
         By default, the resultant .avm file is saved along side the source file.
 
         :param path: The path of the Python file to compile
         :param output_path: Optional path to save the compiled `.avm` file
+        :param cache: Optional ``boa.cache.CompileCache`` to reuse the output of an earlier compilation
+        :param optimize: the optimization level, see ``boa.code.optimize``
         :return: the instance of the compiler
 
         The following returns the compiler object for inspection
@@ -94,25 +294,45 @@ class Compiler(object):
             Compiler.load_and_save('path/to/your/file.py')
         """
 
-        compiler = Compiler.load(os.path.abspath(path), use_nep8=use_nep8)
-        data = compiler.write()
         if output_path is None:
-            fullpath = os.path.realpath(path)
-            path, filename = os.path.split(fullpath)
-            newfilename = filename.replace('.py', '.avm')
-            output_path = '%s/%s' % (path, newfilename)
+            output_path = Compiler.default_output_path(path)
+        avm_name = os.path.splitext(os.path.basename(output_path))[0]
+        options = {'use_nep8': use_nep8, 'optimize': optimize}
+
+        cached = cache.lookup(path, options, avm_name) if cache is not None else None
+
+        if cached is not None:
+            data, debug_json = cached
+        else:
+            compiler = Compiler.load(os.path.abspath(path), use_nep8=use_nep8, optimize=optimize)
+            result = compiler.artifacts(avm_name)
+            data, debug_json = result.data, result.debug_json
+
+            if cache is not None:
+                cache.store(path, options, compiler.context.dependency_hashes, data, debug_json)
 
         Compiler.write_file(data, output_path)
-        compiler.entry_module.export_debug(output_path)
+        Compiler.write_debug_file(debug_json, output_path)
 
         return data
 
     @staticmethod
-    def load(path, use_nep8=True):
+    def load(path, use_nep8=True, registry=None, source=None, resolver=None, trace_memory=False, lean=False,
+             optimize=DEFAULT_LEVEL):
         """
         Call `load` to load a Python file to be compiled but not to write to .avm
 
-        :param path: the path of the Python file to compile
+        :param path: the path of the Python file to compile, or the name to use for it if `source` is given
+        :param registry: Optional ``boa.code.registry.ModuleRegistry`` to reuse files parsed by other compilations
+        :param source: Optional source text to compile instead of reading `path`
+        :param resolver: Optional callable taking the name of an imported module and returning a
+            ``(filename, source)`` tuple for it, or None to import it from the file system
+        :param trace_memory: measure the peak memory used while compiling, see ``Compiler.stats``
+        :param lean: free the parsed bytecode, expressions and Python tokens of each method once it is
+            tokenized, keeping only what writing the script and its debug map needs. ``Module.to_s``
+            and reusing methods in ``boa.watch`` are not possible afterwards
+        :param optimize: the optimization level, ``0`` to write the tokens as they are emitted, ``1``,
+            the default, or ``2``. See ``boa.code.optimize``
         :return: The instance of the compiler
 
         The following returns the compiler object for inspection.
@@ -124,10 +344,103 @@ class Compiler(object):
             compiler = Compiler.load('path/to/your/file.py')
         """
 
-        Compiler.__instance = None
+        compiler = Compiler(use_nep8=use_nep8, registry=registry, resolver=resolver, trace_memory=trace_memory,
+                            lean=lean, optimize=optimize)
+        Compiler.__instance = compiler
 
-        compiler = Compiler.instance()
-        compiler.nep8 = use_nep8
-        compiler.entry_module = Module(path)
+        with compiler.context.stats.tracing():
+            compiler.context.entry_module = Module(path, context=compiler.context, source=source)
 
         return compiler
+
+    @staticmethod
+    def compile_source(source, filename='contract.py', use_nep8=True, resolver=None, registry=None,
+                       optimize=DEFAULT_LEVEL):
+        """
+        Call `compile_source` to compile Python source text in memory, without reading or writing any files.
+
+        Modules imported by the source are loaded from the file system unless ``resolver`` returns
+        their source. A failure to compile is reported in the ``error`` attribute of the result.
+
+        :param source: the Python source text of the contract
+        :param filename: the name of the contract file, used in the debug map and error messages
+        :param use_nep8: whether to compile with NEP8 stack isolation
+        :param resolver: Optional callable taking the name of an imported module and returning a
+            ``(filename, source)`` tuple for it, or None to import it from the file system
+        :param registry: Optional ``boa.code.registry.ModuleRegistry`` to reuse files parsed by other compilations
+        :param optimize: the optimization level, see ``boa.code.optimize``
+        :return: the compiled program, its debug map and hashes
+        :rtype: ``boa.compiler.Artifacts``
+
+        .. code-block:: python
+
+            from boa.compiler import Compiler
+
+            result = Compiler.compile_source('def Main(a):\n    return a + 1\n')
+            script = result.data
+        """
+
+        try:
+            compiler = Compiler.load(filename, use_nep8=use_nep8, registry=registry, source=source, resolver=resolver,
+                                     optimize=optimize)
+            return compiler.artifacts()
+        except Exception as e:
+            return Artifacts(filename, error='%s: %s' % (type(e).__name__, e))
+
+    @staticmethod
+    def compile_many(paths, workers=None, use_nep8=True, use_threads=False, save=False, optimize=DEFAULT_LEVEL):
+        """
+        Call `compile_many` to compile several Python files at once, spread over a pool of workers.
+
+        A failure to compile one file does not stop the others, it is reported in the
+        ``error`` attribute of the ``Artifacts`` for that file. Files imported by several
+        contracts, such as the ``boa.interop`` modules, are parsed once per worker. Each file is
+        compiled in lean mode, see ``Compiler.load``, so memory use does not grow with the number of files.
+
+        :param paths: the paths of the Python files to compile
+        :param workers: the number of workers to use, defaults to the number of CPUs
+        :param use_nep8: whether to compile with NEP8 stack isolation
+        :param use_threads: use a thread pool instead of a process pool
+        :param save: also write the `.avm` and `.debug.json` files alongside each source file
+        :param optimize: the optimization level, see ``boa.code.optimize``
+        :return: a list of ``Artifacts``, in the same order as ``paths``
+
+        .. code-block:: python
+
+            from boa.compiler import Compiler
+
+            for result in Compiler.compile_many(['path/to/a.py', 'path/to/b.py'], workers=4):
+                if not result.success:
+                    print(result.path, result.error)
+        """
+
+        paths = list(paths)
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers <= 1 or len(paths) <= 1:
+            registry = ModuleRegistry()
+            return [_compile_one(path, use_nep8, save, registry, True, optimize) for path in paths]
+
+        if use_threads:
+            registry = ModuleRegistry()
+            with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+                return list(pool.map(lambda path: _compile_one(path, use_nep8, save, registry, True, optimize),
+                                     paths))
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            return list(pool.map(_compile_one, paths, [use_nep8] * len(paths), [save] * len(paths),
+                                 [None] * len(paths), [True] * len(paths), [optimize] * len(paths)))
+
+    @staticmethod
+    def default_output_path(path):
+        """
+        Retrieve the path the `.avm` file for a Python file is saved to when no output path is given.
+
+        :param path: the path of the Python file
+        :return: the path of the `.avm` file alongside the Python file
+        """
+        fullpath = os.path.realpath(path)
+        path, filename = os.path.split(fullpath)
+        newfilename = filename.replace('.py', '.avm')
+        return '%s/%s' % (path, newfilename)
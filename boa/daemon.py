@@ -0,0 +1,393 @@
+"""
+A long running compile server, listening on a UNIX domain socket.
+
+Starting the compiler for every contract costs far more than compiling it: Python has to start,
+``bytecode`` has to be imported and the ``boa.interop`` modules parsed again.
+The daemon pays for this once, then keeps the parsed files in a ``ModuleRegistry`` shared by
+every request.
+
+Start it with:
+
+.. code-block:: bash
+
+    python -m boa.daemon --socket /tmp/neo-boa.sock
+
+Each request and response is a single line of JSON. A request either names a file with
+``path``, or holds the ``source`` of a contract and optionally its ``filename``. A relative ``path``
+is taken from the ``cwd`` of the request, the working directory of the client. The options
+are ``use_nep8``, ``optimize``, the optimization level, ``save``, to write the `.avm` and `.debug.json` files alongside ``path``,
+and ``stats``, to include the ``CompileStats`` of the compilation. Any ``id`` is returned
+unchanged. ``{"command": "ping"}``, ``{"command": "status"}`` and ``{"command": "shutdown"}``
+are also understood.
+
+.. code-block:: python
+
+    from boa.daemon import request
+
+    response = request('/tmp/neo-boa.sock', {'path': 'path/to/your/file.py'})
+    script = bytes.fromhex(response['script'])
+
+When a file of the compiler itself changes, the daemon stops accepting connections, lets the
+compilations in progress finish and starts again with the new code.
+"""
+from boa.code.optimize import DEFAULT_LEVEL
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler, _compile_one
+import argparse
+import glob
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def package_fingerprint(directory=PACKAGE_DIR):
+    """
+    Retrieve the modification time and size of every Python file in the compiler package.
+
+    :param directory: the directory of the package
+    :return: a value that changes whenever a file of the package changes
+    :rtype: tuple
+    """
+    fingerprint = []
+    for path in sorted(glob.glob(os.path.join(directory, '**', '*.py'), recursive=True)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+class CompileRequestHandler(socketserver.BaseRequestHandler):
+    """
+    Handle the requests sent over a single connection, one JSON document per line.
+
+    A connection may stay open for any number of requests. It is closed once the server is closing.
+    """
+
+    def handle(self):
+        buffer = b''
+
+        while not self.server.closing:
+            self.request.settimeout(self.server.idle_timeout)
+            try:
+                chunk = self.request.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+
+            buffer += chunk
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                if line.strip():
+                    self.request.settimeout(None)
+                    self.request.sendall(json.dumps(self.respond(line)).encode('utf-8') + b'\n')
+
+    def respond(self, line):
+        try:
+            message = json.loads(line.decode('utf-8'))
+            if not isinstance(message, dict):
+                raise ValueError('a request must be a JSON object')
+        except ValueError as e:
+            return {'success': False, 'error': 'Invalid request: %s' % e}
+
+        response = self.server.dispatch(message)
+        if 'id' in message:
+            response['id'] = message['id']
+        return response
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Compile contracts sent over a UNIX domain socket.
+
+    Every connection is served by its own thread, but at most ``max_compiles`` contracts are
+    compiled at once. Once ``max_pending`` further compilations are waiting for their turn,
+    new requests are refused with a ``busy`` error rather than queued.
+
+    .. code-block:: python
+
+        from boa.daemon import CompileServer
+
+        server = CompileServer('/tmp/neo-boa.sock')
+        server.serve_forever()
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+    registry = None
+
+    max_compiles = None
+    max_pending = None
+
+    poll_interval = None
+
+    # how often an idle connection checks whether the server is closing, in seconds
+    idle_timeout = 0.5
+
+    closing = False
+    reload_requested = False
+
+    compiled = 0
+    started = None
+
+    _slots = None
+    _pending = 0
+    _lock = None
+    _fingerprint = None
+    _watcher = None
+
+    def __init__(self, socket_path, max_compiles=None, max_pending=64, registry=None, poll_interval=1.0,
+                 max_parsed=256):
+        """
+        :param socket_path: the path of the socket to listen on, replaced if a stale socket exists there
+        :param max_compiles: the number of contracts compiled at once, defaults to the number of CPUs
+        :param max_pending: the number of compilations that may wait for their turn
+        :param registry: Optional ``boa.code.registry.ModuleRegistry`` to keep the parsed files in
+        :param max_parsed: the number of parsed files the registry created for the server keeps
+        :param poll_interval: how often, in seconds, to check the compiler package for changes.
+            Pass None to never reload
+        """
+        if max_compiles is None:
+            max_compiles = os.cpu_count() or 1
+
+        self.registry = registry if registry is not None else ModuleRegistry(max_entries=max_parsed)
+        self.max_compiles = max_compiles
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.closing = False
+        self.reload_requested = False
+        self.compiled = 0
+        self.started = time.time()
+        self._slots = threading.BoundedSemaphore(max_compiles)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._fingerprint = package_fingerprint()
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        super(CompileServer, self).__init__(socket_path, CompileRequestHandler)
+
+    def warm(self):
+        """
+        Parse every ``boa.interop`` module ahead of the first request.
+        """
+        for path in glob.glob(os.path.join(PACKAGE_DIR, 'interop', '**', '*.py'), recursive=True):
+            self.registry.parse(path)
+        self.registry.parse(os.path.join(PACKAGE_DIR, 'builtins.py'))
+
+    def serve_forever(self, poll_interval=0.5):
+        if self.poll_interval is not None and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='boa-daemon-watcher', daemon=True)
+            self._watcher.start()
+        super(CompileServer, self).serve_forever(poll_interval)
+
+    def server_close(self):
+        socket_path = self.server_address
+        super(CompileServer, self).server_close()
+        if isinstance(socket_path, str) and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+    def close(self, reload=False):
+        """
+        Stop accepting requests. ``serve_forever`` returns once the current requests are answered.
+
+        :param reload: record that the server should be started again with the new compiler code
+        """
+        self.reload_requested = self.reload_requested or reload
+        if not self.closing:
+            self.closing = True
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def _watch(self):
+        while not self.closing:
+            time.sleep(self.poll_interval)
+            if package_fingerprint() != self._fingerprint:
+                self.close(reload=True)
+
+    def dispatch(self, message):
+        """
+        Answer a single request.
+
+        :param message: the request
+        :return: the response
+        :rtype: dict
+        """
+        command = message.get('command', 'compile')
+
+        if command == 'ping':
+            return {'success': True}
+        if command == 'status':
+            return self.status()
+        if command == 'shutdown':
+            self.close()
+            return {'success': True}
+        if command != 'compile':
+            return {'success': False, 'error': 'Unknown command %s' % command}
+        if self.closing:
+            return {'success': False, 'error': 'closing'}
+
+        with self._lock:
+            if self._pending >= self.max_compiles + self.max_pending:
+                return {'success': False, 'error': 'busy'}
+            self._pending += 1
+
+        try:
+            with self._slots:
+                return self.compile(message)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def status(self):
+        """
+        :return: the state of the server
+        :rtype: dict
+        """
+        return {
+            'success': True,
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started,
+            'compiled': self.compiled,
+            'pending': self._pending,
+            'max_compiles': self.max_compiles,
+            'parsed_files': len(self.registry),
+            'registry_hits': self.registry.hits,
+            'registry_misses': self.registry.misses,
+        }
+
+    def compile(self, message):
+        """
+        Compile the contract of a request.
+
+        :param message: the request
+        :return: the response
+        :rtype: dict
+        """
+        use_nep8 = message.get('use_nep8', True)
+        optimize = message.get('optimize', DEFAULT_LEVEL)
+
+        if message.get('source') is not None:
+            result = Compiler.compile_source(message['source'], message.get('filename', 'contract.py'),
+                                             use_nep8=use_nep8, registry=self.registry, optimize=optimize)
+        elif message.get('path') is not None:
+            path = message['path']
+            if not os.path.isabs(path):
+                if message.get('cwd') is None:
+                    return {'success': False, 'error': 'A relative path needs the cwd of the client'}
+                path = os.path.join(message['cwd'], path)
+            result = _compile_one(path, use_nep8, message.get('save', False), self.registry,
+                                  optimize=optimize)
+        else:
+            return {'success': False, 'error': 'A compile request needs a path or a source'}
+
+        with self._lock:
+            self.compiled += 1
+
+        response = {
+            'success': result.success,
+            'path': result.path,
+            'error': result.error,
+            'diagnostics': result.diagnostics,
+        }
+
+        if result.success:
+            response['script'] = result.data.hex()
+            response['script_hash'] = result.script_hash
+            response['md5'] = result.md5
+            response['debug_map'] = result.debug_map
+            if message.get('stats') and result.stats is not None:
+                response['stats'] = result.stats.to_dict()
+
+        return response
+
+
+def request(socket_path, message, timeout=None, retry=5.0):
+    """
+    Send a single request to a running daemon and wait for its response.
+
+    While the daemon is starting or reloading its socket may be missing for a moment, so
+    connecting is retried for up to `retry` seconds. A relative ``path`` is sent along with the
+    current working directory.
+
+    :param socket_path: the path of the socket the daemon listens on
+    :param message: the request
+    :param timeout: Optional number of seconds to wait for the response
+    :param retry: the number of seconds to keep trying to connect
+    :return: the response
+    :rtype: dict
+    """
+    if message.get('path') is not None and message.get('cwd') is None and not os.path.isabs(message['path']):
+        message = dict(message, cwd=os.getcwd())
+
+    deadline = time.time() + retry
+
+    while True:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(socket_path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            connection.close()
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.05)
+
+    with connection:
+        connection.settimeout(timeout)
+        connection.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as response:
+            line = response.readline()
+
+    if not line:
+        raise ConnectionError('The daemon closed the connection without responding')
+    return json.loads(line.decode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile contracts sent over a UNIX domain socket')
+    parser.add_argument('--socket', default=os.path.join(os.path.expanduser('~'), '.neo-boa', 'daemon.sock'),
+                        help='the path of the socket to listen on')
+    parser.add_argument('--max-compiles', type=int, help='the number of contracts compiled at once')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='the number of compilations that may wait before requests are refused')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='how often to check the compiler for changes, in seconds')
+    parser.add_argument('--no-reload', action='store_true', help='do not restart when the compiler changes')
+    parser.add_argument('--max-parsed', type=int, default=256,
+                        help='the number of parsed files to keep between requests')
+    args = parser.parse_args(argv)
+
+    directory = os.path.dirname(os.path.abspath(args.socket))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    server = CompileServer(args.socket, args.max_compiles, args.max_pending,
+                           poll_interval=None if args.no_reload else args.poll_interval, max_parsed=args.max_parsed)
+    server.warm()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    if server.reload_requested:
+        os.execv(sys.executable, [sys.executable, '-m', 'boa.daemon'] + (sys.argv[1:] if argv is None else list(argv)))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Recompile a contract whenever it, or a file it imports, changes.
+
+Between compilations the watcher keeps the files it has parsed and the tokens of every method.
+When a file changes, only the methods whose source, or whose module's globals and method names,
+changed are tokenized again; the tokens of all other methods are reused and only the addresses
+of the methods are assigned again.
+
+.. code-block:: bash
+
+    python -m boa.watch path/to/your/file.py
+
+.. code-block:: python
+
+    from boa.watch import Watcher
+
+    watcher = Watcher('path/to/your/file.py')
+    watcher.watch(callback=lambda result: print(result.success, watcher.reused))
+"""
+from boa.code.optimize import DEFAULT_LEVEL
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Artifacts, Compiler
+import argparse
+import os
+import sys
+import time
+
+
+class Watcher(object):
+    """
+    Compile a contract incrementally, reusing what did not change since the previous compilation.
+    """
+
+    path = None
+
+    output_path = None
+
+    use_nep8 = True
+
+    optimize = DEFAULT_LEVEL
+
+    registry = None
+
+    compiler = None
+
+    reused = 0
+    tokenized = 0
+
+    _methods = None
+    _stamps = None
+
+    def __init__(self, path, output_path=None, use_nep8=True, optimize=DEFAULT_LEVEL):
+        """
+        :param path: the path of the contract
+        :param output_path: Optional path to save the compiled `.avm` file to, defaults to alongside the contract
+        :param use_nep8: whether to compile with NEP8 stack isolation
+        :param optimize: the optimization level, see ``boa.code.optimize``
+        """
+        self.path = os.path.abspath(path)
+        self.output_path = output_path if output_path is not None else Compiler.default_output_path(path)
+        self.use_nep8 = use_nep8
+        self.optimize = optimize
+        self.registry = ModuleRegistry()
+        self.reused = 0
+        self.tokenized = 0
+        self._methods = {}
+        self._stamps = {}
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self):
+        """
+        Check whether the contract or any file it imported changed since the last compilation.
+
+        :return: True if the contract has to be compiled again
+        :rtype: bool
+        """
+        if not self._stamps:
+            return True
+        for path, stamp in self._stamps.items():
+            if Watcher._stamp(path) != stamp:
+                return True
+        return False
+
+    def compile(self):
+        """
+        Compile the contract, reusing the tokens of the methods that did not change, and save the
+        `.avm` and `.debug.json` files.
+
+        :return: the compiled program and its debug map
+        :rtype: ``boa.compiler.Artifacts``
+        """
+        avm_name = os.path.splitext(os.path.basename(self.output_path))[0]
+        previous = self._methods
+        watched = list(self._stamps) or [self.path]
+        self._methods = {}
+        self.reused = 0
+        self.tokenized = 0
+
+        try:
+            self.compiler = Compiler.load(self.path, use_nep8=self.use_nep8, registry=self.registry,
+                                          optimize=self.optimize)
+
+            # the contract and each file it imported, as they were when parsed
+            self._stamps = {}
+            for path in self.compiler.context.dependencies:
+                self._stamps[path] = Watcher._stamp(path)
+
+            for method in self.compiler.default.methods:
+                key = (method.module.path, method.full_name)
+                fingerprint = method.fingerprint
+
+                match = previous.pop(key, None)
+                if match is not None and match[0] == fingerprint:
+                    method.reuse(match[1])
+                    self.reused += 1
+                else:
+                    self.tokenized += 1
+
+                self._methods[key] = (fingerprint, method)
+
+            self.compiler.context.stats.count('reused_methods', self.reused)
+
+            result = self.compiler.artifacts(avm_name)
+        except Exception as e:
+            # the tokens of the methods may be half linked, so start over next time
+            self._methods = {}
+            self._stamps = {path: Watcher._stamp(path) for path in watched}
+            return Artifacts(self.path, error='%s: %s' % (type(e).__name__, e))
+
+        Compiler.write_file(result.data, self.output_path)
+        Compiler.write_debug_file(result.debug_json, self.output_path)
+
+        return result
+
+    def watch(self, callback=None, poll_interval=0.5, max_compiles=None):
+        """
+        Compile the contract, then compile it again each time it changes.
+
+        :param callback: Optional callable receiving the ``Artifacts`` of each compilation
+        :param poll_interval: how often to check for changes, in seconds
+        :param max_compiles: Optional number of compilations after which to stop watching
+        """
+        compiles = 0
+
+        while max_compiles is None or compiles < max_compiles:
+            if self.changed():
+                result = self.compile()
+                compiles += 1
+                if callback is not None:
+                    callback(result)
+            else:
+                time.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile a contract each time it changes')
+    parser.add_argument('path', help='the contract to compile')
+    parser.add_argument('-o', '--output', help='the path to save the compiled `.avm` file to')
+    parser.add_argument('--no-nep8', action='store_true', help='compile without NEP8 stack isolation')
+    parser.add_argument('-O', '--optimize', type=int, choices=[0, 1, 2], default=DEFAULT_LEVEL,
+                        help='the optimization level')
+    parser.add_argument('--interval', type=float, default=0.5, help='how often to check for changes, in seconds')
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.path, args.output, not args.no_nep8, args.optimize)
+
+    def report(result):
+        if result.success:
+            print('%s: %s bytes in %.1fms, %s of %s methods reused' % (
+                watcher.output_path, len(result.data), result.stats.total * 1000,
+                watcher.reused, watcher.reused + watcher.tokenized))
+        else:
+            print('%s: %s' % (watcher.path, result.error))
+        sys.stdout.flush()
+
+    try:
+        watcher.watch(report, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
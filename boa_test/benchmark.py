@@ -0,0 +1,299 @@
+"""
+Compile performance benchmark over the contracts in ``boa_test/example``.
+
+Every contract is compiled a number of times and the median and 95th percentile compile
+latency, the peak memory allocated, the size of the script and the number of instructions
+and NOPs in it are reported. The results can be saved as a baseline and later runs compared
+against it, so that a change making the compiler slower, or its output larger, is caught
+before release.
+
+.. code-block:: bash
+
+    # record a baseline
+    python -m boa_test.benchmark --runs 10 --save boa_test/benchmark_baseline.json
+
+    # compare against it, exits with status 1 if anything regressed
+    python -m boa_test.benchmark --runs 10 --baseline boa_test/benchmark_baseline.json
+
+The size, instruction and NOP counts are stored in the baseline as they are, as they do not
+depend on the machine. Latency and memory do, so they are stored relative to those of a
+reference contract compiled in the same run, and a later run is compared the same way. A
+change slowing every contract down alike, the reference included, is not reported.
+"""
+from collections import OrderedDict
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler
+from boa.interop import VMOp
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example')
+
+EXAMPLE_PATTERNS = ['*.py', 'demo/*.py', 'demo/token/*.py']
+
+# the contract the latency and memory of the others are measured against in a baseline
+REFERENCE_CONTRACT = 'demo/NEP5.py'
+
+# the results that only depend on the compiler, and those measured on the machine running it
+DETERMINISTIC = ['size', 'instructions', 'nops']
+MEASURED = ['median', 'p95', 'peak_memory']
+
+
+def find_contracts(root=EXAMPLE_DIR, patterns=EXAMPLE_PATTERNS):
+    """
+    Find the contracts to benchmark.
+
+    :param root: the directory to search
+    :param patterns: the glob patterns of the files to include, relative to `root`
+    :return: the sorted paths of the contracts
+    """
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(root, pattern)))
+    return sorted(path for path in paths if os.path.basename(path) != '__init__.py')
+
+
+def percentile(values, percent):
+    """
+    Retrieve a percentile of a list of values, interpolating between the closest ranks.
+
+    :param values: the values
+    :param percent: the percentile to retrieve, between 0 and 100
+    :return: the percentile
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * percent / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def benchmark_contract(path, runs=5, use_nep8=True, registry=None):
+    """
+    Compile a contract `runs` times, and once more with memory tracing.
+
+    The contract is compiled once before the timed runs, so that the modules it imports are
+    already loaded, and garbage collection is disabled while timing, as ``timeit`` does.
+
+    :param path: the path of the contract
+    :param runs: the number of times to compile it
+    :param use_nep8: whether to compile with NEP8 stack isolation
+    :param registry: Optional ``boa.code.registry.ModuleRegistry`` shared by the runs, by default
+        each run parses every file again
+    :return: the results for the contract
+    :rtype: dict
+    """
+    result = OrderedDict()
+    timings = []
+
+    try:
+        Compiler.load(path, use_nep8=use_nep8, registry=registry).write()
+
+        for _ in range(runs):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                compiler = Compiler.load(path, use_nep8=use_nep8, registry=registry)
+                script = compiler.write()
+                timings.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+
+        compiler = Compiler.load(path, use_nep8=use_nep8, registry=registry, trace_memory=True)
+        script = compiler.write()
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+        return result
+
+    tokens = compiler.default.all_vm_tokens.values()
+
+    result['median'] = percentile(timings, 50)
+    result['p95'] = percentile(timings, 95)
+    result['peak_memory'] = compiler.stats.peak_memory
+    result['size'] = len(script)
+    result['instructions'] = len(tokens)
+    result['nops'] = len([token for token in tokens if token.vm_op == VMOp.NOP])
+    return result
+
+
+def run(paths=None, runs=5, use_nep8=True, shared_registry=False, root=EXAMPLE_DIR):
+    """
+    Benchmark several contracts.
+
+    :param paths: the paths of the contracts, defaults to every contract found by ``find_contracts``
+    :param runs: the number of times to compile each contract
+    :param use_nep8: whether to compile with NEP8 stack isolation
+    :param shared_registry: reuse the parsed files across every compile
+    :param root: the directory the names of the contracts are relative to
+    :return: the results, keyed by the path of each contract relative to `root`
+    :rtype: dict
+    """
+    if paths is None:
+        paths = find_contracts(root)
+
+    registry = ModuleRegistry() if shared_registry else None
+
+    results = OrderedDict()
+    for path in paths:
+        name = os.path.relpath(os.path.abspath(path), root)
+        results[name] = benchmark_contract(os.path.abspath(path), runs, use_nep8, registry)
+    return results
+
+
+def to_baseline(results, reference=REFERENCE_CONTRACT):
+    """
+    Keep what can be compared on any machine from benchmark results: the deterministic results
+    of each contract as they are, and its latency and memory divided by those of `reference`.
+
+    :param results: the results of ``run``
+    :param reference: the name of the contract to measure the others against
+    :return: the baseline, holding the name of the reference and the results of each contract
+    :rtype: dict
+    """
+    scale = results.get(reference, {})
+
+    contracts = OrderedDict()
+    for name, result in results.items():
+        if 'error' in result:
+            contracts[name] = OrderedDict([('error', result['error'])])
+            continue
+
+        relative = OrderedDict()
+        for key in MEASURED:
+            if result.get(key) is not None and scale.get(key):
+                relative[key] = round(result[key] / scale[key], 3)
+        for key in DETERMINISTIC:
+            relative[key] = result[key]
+        contracts[name] = relative
+
+    return OrderedDict([('reference', reference), ('contracts', contracts)])
+
+
+def compare(results, baseline, tolerance=0.25, min_delta=0.002):
+    """
+    Compare benchmark results against a baseline.
+
+    The latency and memory of a contract, relative to those of the reference contract of the
+    baseline, regress when they exceed the baseline by more than `tolerance`, and for latency
+    also by more than `min_delta` seconds, so that the noise in timing the smallest contracts
+    is not reported. Its script size, instruction and NOP counts regress on any increase. A
+    contract that compiled in the baseline but fails to compile now is also a regression.
+    Contracts missing from either side are ignored.
+
+    :param results: the results of ``run``
+    :param baseline: a baseline made by ``to_baseline``
+    :param tolerance: the fraction by which latency and memory may grow
+    :param min_delta: the number of seconds by which latency may grow regardless of `tolerance`
+    :return: a description of each regression
+    :rtype: list
+    """
+    regressions = []
+
+    reference = baseline['reference']
+    current = to_baseline(results, reference)['contracts']
+    scale = results.get(reference, {})
+
+    for name, result in current.items():
+        before = baseline['contracts'].get(name)
+        if before is None or 'error' in before:
+            continue
+        if 'error' in result:
+            regressions.append('%s: no longer compiles, %s' % (name, result['error']))
+            continue
+
+        for key in MEASURED:
+            if result.get(key) is not None and before.get(key):
+                allowed = before[key] * tolerance
+                if key != 'peak_memory':
+                    allowed = max(allowed, min_delta / scale[key])
+                if result[key] > before[key] + allowed:
+                    regressions.append('%s: %s %.3fx -> %.3fx of %s (+%.0f%%)' % (
+                        name, key, before[key], result[key], reference, (result[key] / before[key] - 1) * 100))
+
+        for key in DETERMINISTIC:
+            if key in before and result[key] > before[key]:
+                regressions.append('%s: %s %s -> %s' % (name, key, before[key], result[key]))
+
+    return regressions
+
+
+def _format(key, value):
+    if value is None:
+        return '-'
+    if key in ['median', 'p95']:
+        return '%.1fms' % (value * 1000)
+    if key == 'peak_memory':
+        return '%.1fKB' % (value / 1024.0)
+    return str(value)
+
+
+def format_results(results):
+    """
+    Format benchmark results as a table.
+
+    :param results: the results of ``run``
+    :return: the table
+    :rtype: str
+    """
+    width = max([len(name) for name in results] + [8])
+    header = (width, 'contract', 'median', 'p95', 'peak_memory', 'size', 'instructions', 'nops')
+    lines = ['%-*s %10s %10s %12s %8s %12s %6s' % header]
+
+    for name, result in results.items():
+        if 'error' in result:
+            lines.append('%-*s %s' % (width, name, result['error']))
+        else:
+            lines.append('%-*s %10s %10s %12s %8s %12s %6s' % (
+                width, name, _format('median', result['median']), _format('p95', result['p95']),
+                _format('peak_memory', result['peak_memory']), result['size'], result['instructions'],
+                result['nops']))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark compiling the example contracts')
+    parser.add_argument('paths', nargs='*', help='the contracts to compile, defaults to boa_test/example')
+    parser.add_argument('--runs', type=int, default=5, help='the number of times to compile each contract')
+    parser.add_argument('--baseline', help='a baseline json file to compare the results against')
+    parser.add_argument('--save', help='save the results as a baseline json file')
+    parser.add_argument('--reference', default=REFERENCE_CONTRACT,
+                        help='the contract latency and memory are saved relative to')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='the fraction by which latency and memory may exceed the baseline')
+    parser.add_argument('--min-delta', type=float, default=0.002,
+                        help='the number of seconds by which latency may exceed the baseline')
+    parser.add_argument('--no-nep8', action='store_true', help='compile without NEP8 stack isolation')
+    parser.add_argument('--shared-registry', action='store_true', help='reuse parsed files across compiles')
+    args = parser.parse_args(argv)
+
+    results = run(args.paths or None, args.runs, not args.no_nep8, args.shared_registry)
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(to_baseline(results, args.reference), f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for regression in regressions:
+            print('REGRESSION %s' % regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,19 @@
+# tested
+
+
+def Main():
+
+    total = 0
+    i = 0
+    while i < 5:
+        j = 0
+        while j < 3:
+            j = j + 1
+            total = total + 1
+
+        if i == 1:
+            break
+
+        i = i + 1
+
+    return total
@@ -0,0 +1,61 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.ast_lower import CompiledExpressions, ast_to_instr
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler
+from bytecode import Bytecode
+import ast
+
+
+class TestContract(BoaTest):
+
+    EXPRESSIONS = [
+        '1', '"abc"', "b'\\x01'", 'True', 'None', 'x', 'a.b.c', 'f()', 'f(1, x)', 'a.b(1, c)',
+        'a.b.c(d.e)', 'x + 1', '1 + 2', '-1', '-x', 'not x', '~x', 'f(-1)', 'f(1 + 2)', 'a[1]',
+        '[1, 2]', '(1, 2)', 'x == 1', 'f(x, *y)', 'f(a=1)', 'len(x) * 2 + y.z', 'x.y(z)(1)',
+    ]
+
+    def test_ast_to_instr(self):
+
+        for source in TestContract.EXPRESSIONS:
+            bc = Bytecode.from_code(compile(source, '<ast>', 'eval'))
+            expected = [(instr.name, instr.arg, 7) for instr in bc[:-1]]
+
+            for _ in range(2):
+                node = ast.parse(source, mode='eval').body
+                lowered = [(instr.name, instr.arg, instr.lineno) for instr in ast_to_instr(node, 7)]
+                self.assertEqual(lowered, expected, source)
+
+    def test_ast_to_instr_copies(self):
+
+        node = ast.parse('a[1]', mode='eval').body
+        first = ast_to_instr(node, 1)
+        second = ast_to_instr(node, 2)
+
+        self.assertIsNot(first[0], second[0])
+        self.assertEqual(first[0].lineno, 1)
+        self.assertEqual(second[0].lineno, 2)
+
+    def test_compiled_expressions(self):
+
+        node = ast.parse('a[1]', mode='eval').body
+        expected = [(instr.name, instr.arg) for instr in ast_to_instr(node, 1)]
+
+        compiled = CompiledExpressions(max_entries=1)
+        self.assertEqual([(instr.name, instr.arg) for instr in ast_to_instr(node, 1, compiled)], expected)
+        self.assertEqual(len(compiled), 1)
+        self.assertEqual(compiled.get(ast.dump(node)), tuple(expected))
+        self.assertEqual([(instr.name, instr.arg) for instr in ast_to_instr(node, 2, compiled)], expected)
+
+        other = ast.parse('b[2]', mode='eval').body
+        ast_to_instr(other, 1, compiled)
+        self.assertEqual(len(compiled), 1)
+        self.assertIsNone(compiled.get(ast.dump(node)))
+
+        # each registry keeps its own
+        first, second = ModuleRegistry(), ModuleRegistry()
+        source = 'def Main():\n    d = {"a": [1, 2]}\n    return d\n'
+        Compiler.load('ExpressionsTest.py', source=source, registry=first).write()
+        self.assertEqual(len(first.expressions), 1)
+        self.assertEqual(len(second.expressions), 0)
+        first.clear()
+        self.assertEqual(len(first.expressions), 0)
@@ -0,0 +1,73 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.module import Module
+from boa.compiler import Compiler
+
+
+SOURCE = """from boa.interop.Neo.Blockchain import GetHeader
+from boa.interop.Neo.Transaction import *
+from boa.interop.Neo.Output import *
+from boa.interop.Neo.Input import *
+from boa.interop.Neo.Header import *
+from boa.interop.Neo.Iterator import *
+
+
+def Main():
+    return 1
+"""
+
+
+def scan_attribute(methods, attr):
+    # the lookup done for every attribute before the methods were indexed
+    for pattern in ['Get%s', 'GetTX%s', 'GetInput%s', 'Enumerator%s']:
+        matches = [m for m in methods if pattern % attr in m.full_name]
+        if matches:
+            return pattern % attr, matches
+    matches = [m for m in methods if 'Iter%s' % attr == m.full_name.split('.')[-1]]
+    if matches:
+        return 'Iter%s' % attr, matches
+    return None, []
+
+
+class TestContract(BoaTest):
+
+    def test_resolve_attribute(self):
+
+        module = Compiler.load('attributes.py', source=SOURCE).default
+
+        name, matches = module.resolve_attribute('Hash')
+        self.assertEqual(name, 'GetHash')
+        self.assertEqual([m.full_name for m in matches], ['boa.interop.Neo.Header.GetHash'])
+
+        name, matches = module.resolve_attribute('Index')
+        self.assertEqual(name, 'GetIndex')
+        self.assertEqual(len(matches), 2)
+
+        self.assertEqual(module.resolve_attribute('NoSuchAttribute'), (None, []))
+
+    def test_attribute_table_matches_scan(self):
+
+        module = Compiler.load('attributes.py', source=SOURCE).default
+
+        attrs = set()
+        for m in module.methods:
+            name = m.full_name.split('.')[-1]
+            for prefix in ['GetTX', 'GetInput', 'Get', 'Enumerator', 'Iter']:
+                if name.startswith(prefix):
+                    attrs.add(name[len(prefix):])
+                    attrs.add(name[len(prefix):-1])
+        attrs.update(['Hash', 'Ha', 'Values', 'Nothing'])
+        attrs.discard('')
+
+        for attr in sorted(attrs):
+            self.assertEqual(module.resolve_attribute(attr), scan_attribute(module.methods, attr), attr)
+
+    def test_attribute_table(self):
+
+        module = Compiler.load('attributes.py', source=SOURCE).default
+        table = Module.attribute_table(module.methods)
+
+        self.assertEqual([prefix for prefix, by_attr in table], ['Get', 'GetTX', 'GetInput', 'Enumerator', 'Iter'])
+        for prefix, by_attr in table:
+            for attr, matches in by_attr.items():
+                self.assertNotIn('.', attr)
+                self.assertEqual(len(matches), len(set(matches)))
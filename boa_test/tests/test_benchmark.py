@@ -0,0 +1,80 @@
+from boa_test.tests.boa_test import BoaTest
+from boa_test import benchmark
+from boa.compiler import Compiler
+import copy
+import json
+
+
+class TestContract(BoaTest):
+
+    def test_find_contracts(self):
+
+        paths = benchmark.find_contracts()
+        names = [path.replace(benchmark.EXAMPLE_DIR + '/', '') for path in paths]
+
+        self.assertIn('AddTest1.py', names)
+        self.assertIn('demo/ICO_Template.py', names)
+        self.assertIn('demo/token/crowdsale.py', names)
+        self.assertNotIn('demo/__init__.py', names)
+
+    def test_percentile(self):
+
+        self.assertEqual(benchmark.percentile([3, 1, 2], 50), 2)
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertAlmostEqual(benchmark.percentile(list(range(1, 101)), 95), 95.05)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_run(self):
+
+        paths = ['%s/boa_test/example/AddTest1.py' % TestContract.dirname,
+                 '%s/boa_test/example/DictTest5_ShouldNotCompile.py' % TestContract.dirname]
+        results = benchmark.run(paths, runs=2)
+
+        result = results['AddTest1.py']
+        compiler = Compiler.load(paths[0])
+        self.assertEqual(result['size'], len(compiler.write()))
+        self.assertEqual(result['instructions'], len(compiler.default.all_vm_tokens))
+        self.assertGreaterEqual(result['p95'], result['median'])
+        self.assertGreater(result['peak_memory'], 0)
+        self.assertGreaterEqual(result['nops'], 0)
+        self.assertIn('dictionaries', results['DictTest5_ShouldNotCompile.py']['error'])
+
+        # a baseline holds latency and memory relative to the reference, and the rest as it is
+        baseline = benchmark.to_baseline(results, 'AddTest1.py')
+        self.assertEqual(baseline['reference'], 'AddTest1.py')
+        saved = baseline['contracts']['AddTest1.py']
+        self.assertEqual([saved[key] for key in benchmark.MEASURED], [1.0, 1.0, 1.0])
+        self.assertEqual([saved[key] for key in benchmark.DETERMINISTIC],
+                         [result[key] for key in benchmark.DETERMINISTIC])
+        self.assertEqual(benchmark.compare(results, baseline), [])
+
+        slower = copy.deepcopy(results)
+        slower['AddTest1.py']['median'] *= 10.0
+        self.assertEqual(benchmark.compare(slower, baseline), [])
+
+        results['Other.py'] = copy.deepcopy(result)
+        baseline = benchmark.to_baseline(results, 'AddTest1.py')
+        baseline['contracts']['Other.py']['size'] -= 1
+        baseline['contracts']['Other.py']['median'] /= 10.0
+        regressions = benchmark.compare(results, baseline, min_delta=0)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('x of AddTest1.py', regressions[0])
+        self.assertEqual(benchmark.compare(results, baseline, min_delta=10), regressions[1:])
+
+        results['Other.py'] = {'error': 'Exception: broken'}
+        self.assertEqual(benchmark.compare(results, baseline), ['Other.py: no longer compiles, Exception: broken'])
+
+    def test_baseline(self):
+
+        # the committed baseline only holds what does not depend on the machine it was saved on
+        with open('%s/boa_test/benchmark_baseline.json' % TestContract.dirname) as f:
+            baseline = json.load(f)
+
+        self.assertEqual(baseline['reference'], benchmark.REFERENCE_CONTRACT)
+        reference = baseline['contracts'][benchmark.REFERENCE_CONTRACT]
+        self.assertEqual([reference[key] for key in benchmark.MEASURED], [1.0, 1.0, 1.0])
+
+        path = '%s/boa_test/example/%s' % (TestContract.dirname, benchmark.REFERENCE_CONTRACT)
+        compiler = Compiler.load(path)
+        self.assertEqual(reference['size'], len(compiler.write()))
+        self.assertEqual(reference['instructions'], len(compiler.default.all_vm_tokens))
@@ -0,0 +1,126 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.cache import CompileCache
+from boa.compiler import Compiler
+import os
+import shutil
+import tempfile
+
+
+CONTRACT = """
+from cache_test_helper import add_one
+
+
+def Main(a):
+    return add_one(a)
+"""
+
+HELPER = """
+def add_one(a):
+    return a + %s
+"""
+
+
+class TestContract(BoaTest):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestContract, cls).setUpClass()
+        # the helper module is imported by name, so all tests share one source directory
+        cls.src_dir = tempfile.mkdtemp()
+        cls.contract_path = os.path.join(cls.src_dir, 'CacheTest.py')
+        cls.helper_path = os.path.join(cls.src_dir, 'cache_test_helper.py')
+
+        with open(cls.contract_path, 'w') as f:
+            f.write(CONTRACT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.src_dir)
+        super(TestContract, cls).tearDownClass()
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.write_helper(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def write_helper(self, value):
+        with open(self.helper_path, 'w') as f:
+            f.write(HELPER % value)
+
+    def test_cache_hit(self):
+        cache = CompileCache(self.cache_dir)
+
+        output = Compiler.load_and_save(self.contract_path, cache=cache)
+        self.assertEqual(cache.misses, 1)
+        os.remove(self.contract_path.replace('.py', '.avm'))
+
+        cached_output = Compiler.load_and_save(self.contract_path, cache=cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(output, cached_output)
+
+        with open(self.contract_path.replace('.py', '.avm'), 'rb') as f:
+            self.assertEqual(f.read(), output)
+        self.assertTrue(os.path.exists(self.contract_path.replace('.py', '.debug.json')))
+
+    def test_cache_options(self):
+        cache = CompileCache(self.cache_dir)
+
+        output = Compiler.load_and_save(self.contract_path, cache=cache)
+        nonnep8_output = Compiler.load_and_save(self.contract_path, use_nep8=False, cache=cache)
+
+        self.assertEqual(cache.misses, 2)
+        self.assertNotEqual(output, nonnep8_output)
+
+    def test_cache_import_changed(self):
+        cache = CompileCache(self.cache_dir)
+
+        output = Compiler.load_and_save(self.contract_path, cache=cache)
+
+        self.write_helper(2)
+        changed_output = Compiler.load_and_save(self.contract_path, cache=cache)
+
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 2)
+        self.assertNotEqual(output, changed_output)
+        self.assertEqual(changed_output, Compiler.load(self.contract_path).write())
+
+    def test_cache_changed_while_compiling(self):
+        cache = CompileCache(self.cache_dir)
+        store = cache.store
+
+        def store_after_edit(*args):
+            # the helper is saved again after it was parsed, before the output is stored
+            self.write_helper(2)
+            store(*args)
+
+        cache.store = store_after_edit
+        output = Compiler.load_and_save(self.contract_path, cache=cache)
+
+        cache = CompileCache(self.cache_dir)
+        changed_output = Compiler.load_and_save(self.contract_path, cache=cache)
+
+        self.assertEqual(cache.hits, 0)
+        self.assertNotEqual(output, changed_output)
+        self.assertEqual(changed_output, Compiler.load(self.contract_path).write())
+
+    def test_cache_debug_name(self):
+        cache = CompileCache(self.cache_dir)
+        output_path = os.path.join(self.src_dir, 'Renamed.avm')
+
+        Compiler.load_and_save(self.contract_path, cache=cache)
+        Compiler.load_and_save(self.contract_path, output_path=output_path, cache=cache)
+        self.assertEqual(cache.hits, 1)
+
+        with open(output_path.replace('.avm', '.debug.json')) as f:
+            self.assertIn('"name": "Renamed"', f.read())
+
+    def test_cache_eviction(self):
+        cache = CompileCache(self.cache_dir, max_size=0)
+
+        Compiler.load_and_save(self.contract_path, cache=cache)
+        self.assertEqual(cache.size, 0)
+
+        Compiler.load_and_save(self.contract_path, cache=cache)
+        self.assertEqual(cache.hits, 0)
@@ -0,0 +1,39 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.compiler import Compiler
+
+
+class TestContract(BoaTest):
+
+    FILES = ['boa_test/example/AddTest1.py',
+             'boa_test/example/DictTest1.py',
+             'boa_test/example/demo/ICO_Template.py',
+             'boa_test/example/DictTest5_ShouldNotCompile.py']
+
+    def paths(self):
+        return ['%s/%s' % (TestContract.dirname, path) for path in self.FILES]
+
+    def check_results(self, results):
+        self.assertEqual(len(results), 4)
+
+        for path, result in zip(self.paths()[:3], results[:3]):
+            self.assertEqual(result.path, path)
+            self.assertTrue(result.success)
+            self.assertEqual(result.data, Compiler.load(path).write())
+            self.assertIn('"avm"', result.debug_json)
+
+        self.assertFalse(results[3].success)
+        self.assertIsNone(results[3].data)
+        self.assertIn('dictionaries inside of dictionaries', results[3].error)
+
+    def test_compile_many_processes(self):
+        self.check_results(Compiler.compile_many(self.paths(), workers=2))
+
+    def test_compile_many_threads(self):
+        self.check_results(Compiler.compile_many(self.paths(), workers=4, use_threads=True))
+
+    def test_compile_many_serial(self):
+        self.check_results(Compiler.compile_many(self.paths(), workers=1))
+
+    def test_compile_many_nonnep8(self):
+        results = Compiler.compile_many(self.paths()[:1], use_nep8=False)
+        self.assertEqual(results[0].data, Compiler.load(self.paths()[0], use_nep8=False).write())
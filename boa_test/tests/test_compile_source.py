@@ -0,0 +1,63 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.compiler import Compiler
+from neo.Prompt.Commands.BuildNRun import TestBuild
+import json
+
+
+CONTRACT = """
+from source_test_lib import add_two
+from boa.builtins import concat
+
+
+def Main(a):
+    return add_two(a) * 3
+"""
+
+LIB = """
+def add_two(a):
+    return a + 2
+"""
+
+
+class TestContract(BoaTest):
+
+    def test_compile_source(self):
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        with open(path) as f:
+            source = f.read()
+
+        result = Compiler.compile_source(source, 'ICO_Template.py')
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.data, Compiler.load(path).write())
+        self.assertEqual(result.debug_map['avm']['name'], 'ICO_Template')
+        self.assertEqual(result.debug_map['avm']['hash'], result.md5)
+        self.assertEqual(len(result.diagnostics), 0)
+
+    def test_compile_source_resolver(self):
+        requested = []
+
+        def resolver(module_name):
+            requested.append(module_name)
+            if module_name == 'source_test_lib':
+                return 'source_test_lib.py', LIB
+            return None
+
+        result = Compiler.compile_source(CONTRACT, resolver=resolver)
+
+        self.assertTrue(result.success)
+        self.assertEqual(requested, ['source_test_lib', 'boa.builtins'])
+        self.assertIn('source_test_lib.py', json.dumps(result.debug_map['files']))
+
+        tx, results, total_ops, engine = TestBuild(result.data, [4], self.GetWallet1(), '02', '02')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].GetBigInteger(), 18)
+
+    def test_compile_source_error(self):
+        result = Compiler.compile_source(CONTRACT)
+
+        self.assertFalse(result.success)
+        self.assertIsNone(result.data)
+        self.assertIsNone(result.script_hash)
+        self.assertIn('source_test_lib', result.error)
+        self.assertEqual(result.diagnostics, [result.error])
@@ -0,0 +1,77 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.registry import ModuleRegistry
+from boa.code.stats import CompileStats
+from boa.compiler import Compiler
+import json
+import tracemalloc
+
+
+class TestContract(BoaTest):
+
+    def test_compile_stats(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        compiler = Compiler.load(path)
+        output = compiler.write()
+        stats = compiler.stats
+
+        for name in CompileStats.PHASES:
+            self.assertIn(name, stats.phases)
+            self.assertGreater(stats.calls[name], 0)
+        self.assertAlmostEqual(stats.total, sum(stats.phases.values()))
+
+        self.assertEqual(stats.counters['bytes'], len(output))
+        self.assertEqual(stats.counters['modules'], len(compiler.context.modules))
+        self.assertEqual(sum(method['bytes'] for method in stats.methods.values()), len(output))
+        self.assertEqual(sum(method['tokens'] for method in stats.methods.values()), stats.counters['vm_tokens'])
+        self.assertIn(compiler.default.main.full_name, stats.methods)
+
+        data = json.loads(stats.to_json())
+        self.assertEqual(list(data['phases'].keys()), CompileStats.PHASES)
+        self.assertIsNone(data['peak_memory'])
+
+    def test_compile_stats_registry(self):
+
+        registry = ModuleRegistry()
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+
+        first = Compiler.load(path, registry=registry).artifacts()
+        second = Compiler.load(path, registry=registry).artifacts()
+
+        self.assertGreater(first.stats.phases['compile'], 0)
+        self.assertEqual(second.stats.phases['compile'], 0)
+        self.assertEqual(second.stats.calls['preprocess'], 0)
+        self.assertEqual(first.stats.counters, second.stats.counters)
+
+    def test_compile_stats_memory(self):
+
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname, trace_memory=True)
+        compiler.write()
+
+        self.assertGreater(compiler.stats.peak_memory, 0)
+
+    def test_compile_stats_memory_stopped(self):
+
+        # a compile failing while memory is traced does not leave tracing on
+        with self.assertRaises(Exception):
+            Compiler.load('Broken.py', source='def Main(:\n', trace_memory=True)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        # compiles tracing at the same time do not stop tracing for each other
+        first, second = CompileStats(trace_memory=True), CompileStats(trace_memory=True)
+        with first.tracing():
+            with second.tracing():
+                pass
+            self.assertTrue(tracemalloc.is_tracing())
+            bytearray(100000)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(first.peak_memory, 100000)
+
+        # nor stop tracing started outside of the compiler
+        tracemalloc.start()
+        try:
+            with first.tracing():
+                pass
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,97 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.compiler import Compiler
+from boa.daemon import CompileServer, request
+import os
+import shutil
+import tempfile
+import threading
+
+
+class TestContract(BoaTest):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'daemon.sock')
+        self.server = CompileServer(self.socket_path, max_compiles=2, poll_interval=None)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.close()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_daemon_compile_path(self):
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        expected = Compiler.load(path).write()
+
+        first = request(self.socket_path, {'path': path, 'id': 1})
+        second = request(self.socket_path, {'path': path, 'id': 2, 'stats': True})
+
+        self.assertTrue(first['success'])
+        self.assertEqual(first['id'], 1)
+        self.assertEqual(bytes.fromhex(first['script']), expected)
+        self.assertEqual(second['script'], first['script'])
+        self.assertEqual(second['debug_map']['avm']['name'], 'ICO_Template')
+        self.assertEqual(second['stats']['phases']['compile'], 0)
+
+        status = request(self.socket_path, {'command': 'status'})
+        self.assertEqual(status['compiled'], 2)
+        self.assertGreater(status['registry_hits'], 0)
+
+    def test_daemon_compile_source(self):
+        response = request(self.socket_path, {'source': 'def Main(a):\n    return a + 1\n', 'use_nep8': False})
+        expected = Compiler.compile_source('def Main(a):\n    return a + 1\n', use_nep8=False)
+
+        self.assertTrue(response['success'])
+        self.assertEqual(response['script_hash'], expected.script_hash)
+
+    def test_daemon_errors(self):
+        path = '%s/boa_test/example/DictTest5_ShouldNotCompile.py' % TestContract.dirname
+
+        response = request(self.socket_path, {'path': path})
+        self.assertFalse(response['success'])
+        self.assertIn('dictionaries', response['error'])
+
+        self.assertFalse(request(self.socket_path, {})['success'])
+        self.assertFalse(request(self.socket_path, {'command': 'unknown'})['success'])
+        self.assertTrue(request(self.socket_path, {'command': 'ping'})['success'])
+
+    def test_daemon_relative_path(self):
+        path = os.path.relpath('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname)
+        expected = Compiler.load(path).write()
+
+        # the path is taken from the working directory of the client, not the daemon
+        response = self.server.dispatch({'path': path})
+        self.assertFalse(response['success'])
+        self.assertIn('cwd', response['error'])
+
+        response = request(self.socket_path, {'path': path})
+        self.assertTrue(response['success'], response['error'])
+        self.assertEqual(bytes.fromhex(response['script']), expected)
+
+    def test_daemon_concurrent(self):
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        results = []
+
+        def compile_path():
+            results.append(request(self.socket_path, {'path': path}))
+
+        threads = [threading.Thread(target=compile_path) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(len(set(result['script'] for result in results)), 1)
+
+    def test_daemon_reload(self):
+        self.server.poll_interval = 0.05
+        self.server._fingerprint = ()
+        self.server._watch()
+
+        self.thread.join()
+        self.assertTrue(self.server.reload_requested)
+        self.assertEqual(self.server.dispatch({'path': 'Contract.py'}), {'success': False, 'error': 'closing'})
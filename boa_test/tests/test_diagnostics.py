@@ -0,0 +1,79 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.diagnostics import Diagnostics, ERROR, INFO, WARNING
+from boa.compiler import Compiler
+import contextlib
+import io
+
+
+class Formatted(object):
+
+    formatted = 0
+
+    def __str__(self):
+        Formatted.formatted += 1
+        return 'formatted'
+
+
+class TestContract(BoaTest):
+
+    def test_op_not_converted(self):
+
+        source = 'def Main(a):\n    del a\n    return 1\n'
+        compiler = Compiler.load('DiagnosticsTest.py', source=source)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            compiler.write()
+
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(compiler.diagnostics.counts['op_not_converted'], 1)
+
+        warning = compiler.diagnostics.warnings[0]
+        self.assertEqual(warning.path, 'DiagnosticsTest.py')
+        self.assertEqual(warning.lineno, 2)
+        self.assertEqual(warning.method, 'Main')
+        self.assertIn('DELETE_FAST', warning.message)
+        self.assertEqual(str(warning), 'DiagnosticsTest.py:2: warning in Main(): ' + warning.message)
+
+        result = Compiler.load('DiagnosticsTest.py', source=source).artifacts()
+        self.assertTrue(result.success)
+        self.assertEqual(result.diagnostics, [str(warning)])
+
+    def test_tokenize_error(self):
+
+        source = 'def Main(a):\n    x = [i for i in a]\n    return x\n'
+        compiler = Compiler.load('DiagnosticsTest.py', source=source)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(Exception) as context:
+                compiler.write()
+
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(len(compiler.diagnostics.errors), 1)
+        error = compiler.diagnostics.errors[0]
+        self.assertEqual(error.lineno, 2)
+
+        # the exception names the line as well, without repeating it in the diagnostic
+        self.assertTrue(str(context.exception).startswith('DiagnosticsTest.py:2: in Main(): '))
+        self.assertTrue(str(context.exception).endswith(error.message))
+        self.assertNotIn('DiagnosticsTest.py:2:', error.message)
+
+    def test_lazy_formatting(self):
+
+        diagnostics = Diagnostics(limit=2)
+        Formatted.formatted = 0
+
+        for _ in range(5):
+            diagnostics.info('example', 'value %s', Formatted())
+        diagnostics.error('failure', 'failed')
+
+        self.assertEqual(Formatted.formatted, 0)
+        self.assertEqual(diagnostics.counts, {'example': 5, 'failure': 1})
+        self.assertEqual(len(diagnostics), 2)
+        self.assertEqual(diagnostics.filter(WARNING), [])
+
+        items = diagnostics.to_list(INFO)
+        self.assertEqual(items[0]['message'], 'value formatted')
+        self.assertEqual(items[0]['severity'], 'info')
+        self.assertEqual(Formatted.formatted, 2)
@@ -0,0 +1,102 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.imports import ImportResolver
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler
+import os
+import shutil
+import sys
+import tempfile
+
+
+CONTRACT = """from resolverhelper import add_one
+
+
+def Main(a):
+    return add_one(a)
+"""
+
+HELPER = """def add_one(a):
+    return a + %s
+"""
+
+
+class TestContract(BoaTest):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, source):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(source)
+        return path
+
+    def test_import_without_executing(self):
+
+        contract = self.write('contract.py', CONTRACT)
+        self.write('resolverhelper.py', HELPER % 1)
+        sys_path = list(sys.path)
+
+        compiler = Compiler.load(contract)
+        compiler.write()
+
+        self.assertEqual(sys.path, sys_path)
+        self.assertNotIn('resolverhelper', sys.modules)
+        self.assertIn(os.path.join(self.directory, 'resolverhelper.py'), compiler.context.dependencies)
+
+    def test_changed_helper_across_compiles(self):
+
+        registry = ModuleRegistry()
+        contract = self.write('contract.py', CONTRACT)
+        helper = self.write('resolverhelper.py', HELPER % 1)
+
+        first = Compiler.load(contract, registry=registry).write()
+
+        self.write('resolverhelper.py', HELPER % 2)
+        os.utime(helper, ns=(0, 0))
+
+        second = Compiler.load(contract, registry=registry).write()
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(second, Compiler.load(contract).write())
+        self.assertEqual(registry.imports.hits, len(registry.imports))
+
+    def test_resolve(self):
+
+        resolver = ImportResolver()
+        contract = self.write('contract.py', CONTRACT)
+        helper = self.write('resolverhelper.py', HELPER % 1)
+        package = self.write('helpers/__init__.py', '')
+        storage = self.write('helpers/storage.py', HELPER % 1)
+
+        self.assertEqual(resolver.resolve('resolverhelper', contract), helper)
+        self.assertEqual(resolver.resolve('helpers', contract), package)
+        self.assertEqual(resolver.resolve('helpers.storage', contract), storage)
+        self.assertEqual(resolver.resolve('storage', storage, level=1), storage)
+        self.assertEqual(resolver.resolve('helpers.storage', contract), storage)
+        self.assertEqual(resolver.hits, 1)
+
+        with self.assertRaises(ModuleNotFoundError):
+            resolver.resolve('nosuchmodule', contract)
+
+        self.assertTrue(resolver.resolve('boa.interop.Neo.Runtime', contract).endswith(
+            os.path.join('boa', 'interop', 'Neo', 'Runtime.py')))
+
+    def test_search_path(self):
+
+        contract = self.write('contract.py', CONTRACT)
+        self.write('resolverhelper.py', HELPER % 1)
+        shared = os.path.join(self.directory, 'shared')
+
+        resolver = ImportResolver([shared])
+        self.assertEqual(resolver.resolve('resolverhelper', contract), os.path.join(self.directory, 'resolverhelper.py'))
+
+        # a module added to a directory searched earlier is found once that directory changes
+        shadow = self.write('shared/resolverhelper.py', HELPER % 2)
+        self.assertEqual(resolver.resolve('resolverhelper', contract), shadow)
+        self.assertEqual(resolver.hits, 0)
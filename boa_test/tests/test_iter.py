@@ -27,6 +27,13 @@ class TestContract(BoaTest):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].GetBigInteger(), 24)
 
+    def test_aWhile4(self):
+        output = Compiler.instance().load('%s/boa_test/example/WhileTest3.py' % TestContract.dirname).default
+        out = output.write()
+        tx, results, total_ops, engine = TestBuild(out, [], self.GetWallet1(), '', '07')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].GetBigInteger(), 6)
+
     def test_Iter1(self):
         output = Compiler.instance().load('%s/boa_test/example/IterTest.py' % TestContract.dirname).default
         out = output.write()
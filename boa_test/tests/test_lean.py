@@ -0,0 +1,53 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.pytoken import DebugToken
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler, _compile_one
+
+
+class TestContract(BoaTest):
+
+    def test_lean_output(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+
+        for use_nep8 in [True, False]:
+            expected = Compiler.load(path, use_nep8=use_nep8).artifacts('ICO_Template')
+            result = Compiler.load(path, use_nep8=use_nep8, lean=True).artifacts('ICO_Template')
+
+            self.assertEqual(result.data, expected.data)
+            self.assertEqual(result.debug_json, expected.debug_json)
+
+    def test_lean_releases_methods(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        compiler = Compiler.load(path, lean=True, trace_memory=True)
+        compiler.write()
+
+        for module in compiler.context.modules:
+            self.assertIsNone(module.parsed)
+            self.assertIsNone(module.cfg)
+
+        for method in compiler.default.methods:
+            self.assertIsNone(method.bytecode)
+            self.assertIsNone(method._expressions)
+            self.assertGreater(len(method.vm_tokens), 0)
+            for vmtoken in method.vm_tokens.values():
+                self.assertTrue(vmtoken.pytoken is None or isinstance(vmtoken.pytoken, DebugToken))
+
+        full = Compiler.load(path, trace_memory=True)
+        full.write()
+        self.assertLess(compiler.stats.peak_memory, full.stats.peak_memory)
+
+    def test_compile_many_lean(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+        registry = ModuleRegistry()
+
+        result = _compile_one(path, registry=registry, lean=True)
+        self.assertTrue(result.success)
+        self.assertEqual(result.data, Compiler.load(path).write())
+
+        # the imported files stay parsed, the contract itself does not
+        parsed = len(registry)
+        self.assertGreater(parsed, 0)
+        self.assertEqual(registry.misses, parsed + 1)
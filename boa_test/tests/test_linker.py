@@ -0,0 +1,253 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.compiler import Compiler
+from boa.interop import VMOp
+
+from neo.Prompt.Commands.BuildNRun import TestBuild
+
+
+class TestContract(BoaTest):
+
+    def test_method_by_name(self):
+
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname)
+        module = compiler.default
+
+        for m in module.methods:
+            self.assertIs(module.method_by_name(m.full_name), m)
+            self.assertEqual(module.method_by_name(m.name).name, m.name)
+            self.assertIs(module.method_by_name(m.name), module.method_named(m.name))
+
+        self.assertIsNone(module.method_by_name('NoSuchMethod'))
+
+    def test_symbol_index(self):
+
+        source = ('def helper(a):\n'
+                  '    return a + 1\n'
+                  '\n'
+                  '\n'
+                  'def Main(a):\n'
+                  '    return helper(a)\n'
+                  '\n'
+                  '\n'
+                  'def helper(a):\n'
+                  '    return a + 2\n')
+
+        module = Compiler.load('SymbolIndexTest.py', source=source).default
+        methods = list(module.methods)
+
+        self.assertEqual(module.main.name, 'Main')
+        self.assertTrue(module.has_method('Main'))
+        self.assertFalse(module.has_method('NoSuchMethod'))
+        self.assertIsNone(module.method_named('NoSuchMethod'))
+
+        # a method defined again under the same full name is only added once
+        self.assertEqual([m.name for m in methods].count('helper'), 1)
+        self.assertEqual(module.method_named('helper').start_line_no, 1)
+        self.assertIs(module.method_by_name('helper'), module.method_named('helper'))
+
+        ordered = module.orderered_methods
+        self.assertIs(ordered[0], module.main)
+        self.assertEqual(module.orderered_methods, ordered)
+        self.assertEqual(module.methods, methods)
+
+    def test_relocations(self):
+
+        for use_nep8, call in [(True, VMOp.CALL_I), (False, VMOp.CALL)]:
+            compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname, use_nep8=use_nep8)
+            module = compiler.default
+            module.write()
+
+            calls = [token for token in module.all_vm_tokens.values() if token.vm_op == call]
+            relocations = [token for m in module.methods if not m.is_interop for token in m.tokenizer.relocations]
+
+            self.assertGreater(len(relocations), 0)
+            self.assertEqual(set(map(id, calls)), set(map(id, relocations)))
+
+            for token in relocations:
+                target = module.method_by_name(token.target_method)
+                offset = int.from_bytes(token.data[-2:], 'little', signed=True)
+                self.assertEqual(token.addr + offset + (2 if use_nep8 else 0), target.address)
+
+    def far_call_source(self):
+        filler = ''.join("    a%s = b'%s'\n" % (i, 'x' * 1000) for i in range(18))
+        fillers = ''.join('def filler%s():\n%s    return 1\n\n' % (i, filler) for i in range(2))
+        return 'def Main(a):\n    return far(a) + far(2)\n\n' + 'def far(b):\n    return b + 1\n\n' + fillers
+
+    def test_far_calls(self):
+
+        for use_nep8 in [True, False]:
+            compiler = Compiler.load('far.py', use_nep8=use_nep8, source=self.far_call_source())
+            module = compiler.default
+            out = module.write()
+
+            self.assertGreater(len(out), 32768)
+            self.assertEqual(compiler.stats.counters['trampolines'], 1)
+
+            far = module.method_by_name('far')
+            trampolines = [token for token in module.all_vm_tokens.values()
+                           if token.vm_op == VMOp.JMP and token.target_method is not None]
+            self.assertEqual(len(trampolines), 1)
+
+            for token in trampolines:
+                self.assertIsNone(token.pytoken)
+                self.assertEqual(token.target_method, far.full_name)
+
+            # the last trampoline leads to the method
+            offset = int.from_bytes(trampolines[-1].data, 'little', signed=True)
+            self.assertEqual(trampolines[-1].addr + offset, far.address)
+
+            tx, results, total_ops, engine = TestBuild(out, [3], self.GetWallet1(), '02', '02')
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].GetBigInteger(), 7)
+
+    def test_thread_jumps(self):
+
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname)
+        module = compiler.default
+        module.write()
+
+        self.assertGreater(compiler.stats.counters['threaded_jumps'], 0)
+
+        jumps = [VMOp.JMP, VMOp.JMPIF, VMOp.JMPIFNOT]
+        for token in module.all_vm_tokens.values():
+            if token.vm_op in jumps:
+                target = module.all_vm_tokens.get(token.addr + int.from_bytes(token.data, 'little', signed=True))
+                self.assertIsNotNone(target)
+                if target is not token:
+                    self.assertNotEqual(target.vm_op, VMOp.JMP)
+
+        # level 0 writes the jumps as they were emitted
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname, optimize=0)
+        compiler.write()
+        self.assertNotIn('threaded_jumps', compiler.stats.counters)
+        self.assertNotIn('thread_jumps', compiler.stats.optimizations)
+
+    def test_far_jump_in_method(self):
+
+        body = ''.join("        a%s = b'%s'\n" % (i, 'x' * 1000) for i in range(34))
+        source = 'def Main(a):\n    while a < 3:\n%s        a = a + 1\n    return a\n' % body
+
+        result = Compiler.compile_source(source, 'far.py')
+        self.assertFalse(result.success)
+        self.assertIn('out of range', result.error)
+
+    def test_frame_size(self):
+
+        source = ('def Main(a):\n'
+                  '    total = 0\n'
+                  '    for x in a:\n'
+                  '        total = total + x\n'
+                  '    for y in a:\n'
+                  '        total = total + y * 2\n'
+                  '    for z in a:\n'
+                  '        total = total + z * 3\n'
+                  '    return total\n')
+
+        compiler = Compiler.load('FrameSizeTest.py', source=source)
+        out = compiler.write()
+        main = compiler.default.main
+
+        # the argument, the locals and the counter and length of each loop
+        self.assertEqual(main.stacksize, 11)
+        self.assertEqual(main.tokenizer.frame_size, main.stacksize)
+        first = main.tokenizer.total_param_and_body_count_token
+        self.assertEqual(first.out_op, 0x50 + main.stacksize)
+
+        # ten PUSH0 in front of the argument would take more bytes than storing it into an empty frame
+        self.assertEqual(main.scope['a'], 0)
+        ops = [vmtoken.out_op for vmtoken in main.vm_tokens.values()][:8]
+        self.assertEqual(ops, [ord(VMOp.PUSH11), ord(VMOp.NEWSTRUCT), ord(VMOp.TOALTSTACK),
+                               ord(VMOp.DUPFROMALTSTACK), ord(VMOp.PUSH0), ord(VMOp.PUSH2), ord(VMOp.ROLL),
+                               ord(VMOp.SETITEM)])
+
+        tx, results, total_ops, engine = TestBuild(out, [[1, 2, 3]], self.GetWallet1(), '10', '02')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].GetBigInteger(), 36)
+
+        # loops taking the frame past 16 locals need a longer push, moving every token after it
+        locals = ''.join('    v%s = a[0]\n' % i for i in range(10))
+        source_big = source.replace('    total = 0\n', '    total = 0\n' + locals)
+        compiler = Compiler.load('FrameSizeTest.py', source=source_big)
+        out = compiler.write()
+        main = compiler.default.main
+
+        self.assertEqual(main.stacksize, 21)
+        self.assertEqual(main.tokenizer.total_param_and_body_count_token.data, bytearray([21]))
+
+        tx, results, total_ops, engine = TestBuild(out, [[1, 2, 3]], self.GetWallet1(), '10', '02')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].GetBigInteger(), 36)
+
+        # a local added once the frame is sized is reported when linking
+        compiler = Compiler.load('FrameSizeTest.py', source=source)
+        compiler.default.main.prepare()
+        compiler.default.main.add_to_scope('late')
+        with self.assertRaises(Exception) as context:
+            compiler.write()
+        self.assertIn('frame', str(context.exception))
+
+        # as is a frame emitted smaller than the locals used, decoded from the tokens
+        compiler = Compiler.load('FrameSizeTest.py', source=source)
+        main = compiler.default.main
+        main.prepare()
+        self.assertEqual(main.tokenizer.emitted_frame_size(), 11)
+        main.tokenizer.set_push_integer(main.tokenizer.total_param_and_body_count_token, 10)
+        self.assertEqual(main.tokenizer.emitted_frame_size(), 10)
+        with self.assertRaises(Exception) as context:
+            compiler.write()
+        self.assertIn('frame', str(context.exception))
+
+        # or a local stored past the end of the frame
+        compiler = Compiler.load('FrameSizeTest.py', source=source)
+        main = compiler.default.main
+        main.prepare()
+        vmtoken, name = main.tokenizer.frame_slots[-1]
+        main.tokenizer.set_push_integer(vmtoken, main.stacksize)
+        with self.assertRaises(Exception) as context:
+            compiler.write()
+        self.assertIn('slot %s' % main.stacksize, str(context.exception))
+
+    def test_packed_frame(self):
+
+        source = ('def Main(a, b, c):\n'
+                  '    total = add(a, b)\n'
+                  '    scaled = total * c\n'
+                  '    return scaled - add(c, 1)\n'
+                  '\n'
+                  '\n'
+                  'def add(x, y):\n'
+                  '    return x + y\n')
+
+        compiler = Compiler.load('PackedFrameTest.py', source=source, optimize=0)
+        out = compiler.write()
+
+        # the other locals are pushed in front of the arguments, which are packed as they are
+        main = compiler.default.main
+        self.assertEqual(main.scope, {'total': 0, 'scaled': 1, 'a': 2, 'b': 3, 'c': 4})
+        ops = [vmtoken.out_op for vmtoken in main.vm_tokens.values()][:6]
+        self.assertEqual(ops, [ord(VMOp.PUSH0), ord(VMOp.PUSH0), ord(VMOp.PUSH5), ord(VMOp.PACK),
+                               ord(VMOp.NEWSTRUCT), ord(VMOp.TOALTSTACK)])
+
+        # a method without other locals packs its arguments as they are, without padding
+        add = compiler.default.method_named('add')
+        self.assertEqual(add.scope, {'x': 0, 'y': 1})
+        ops = [vmtoken.out_op for vmtoken in add.vm_tokens.values()][:4]
+        self.assertEqual(ops, [ord(VMOp.PUSH2), ord(VMOp.PACK), ord(VMOp.NEWSTRUCT), ord(VMOp.TOALTSTACK)])
+        self.assertNotIn(ord(VMOp.SETITEM), [vmtoken.out_op for vmtoken in add.vm_tokens.values()])
+
+        for arguments, value in [([1, 2, 3], 5), ([4, 0, 2], 5), ([0, 0, 0], -1)]:
+            tx, results, total_ops, engine = TestBuild(out, list(arguments), self.GetWallet1(), '020202', '02')
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].GetBigInteger(), value)
+
+        # the padding is part of the frame decoded from the tokens
+        compiler = Compiler.load('PackedFrameTest.py', source=source, optimize=0)
+        main = compiler.default.main
+        main.prepare()
+        self.assertEqual(main.tokenizer.emitted_frame_size(), 5)
+        padding = next(iter(main.vm_tokens.values()))
+        padding.vm_op = VMOp.PUSH1
+        self.assertIsNone(main.tokenizer.emitted_frame_size())
+        with self.assertRaises(Exception) as context:
+            compiler.write()
+        self.assertIn('frame', str(context.exception))
@@ -0,0 +1,89 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.registry import ModuleRegistry
+from boa.compiler import Compiler
+import os
+import shutil
+import tempfile
+
+
+class TestContract(BoaTest):
+
+    def test_shared_import_parsed_once(self):
+
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname)
+
+        paths = [os.path.realpath(module.path) for module in compiler.context.modules]
+        self.assertEqual(len(paths), len(set(paths)))
+        self.assertEqual(compiler.context.registry.misses, len(paths))
+
+    def test_registry_across_compiles(self):
+
+        registry = ModuleRegistry()
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+
+        expected = Compiler.load(path).write()
+
+        first = Compiler.load(path, registry=registry).write()
+        misses = registry.misses
+        second = Compiler.load(path, registry=registry).write()
+
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(registry.misses, misses)
+        self.assertEqual(registry.hits, misses)
+
+        nonnep8 = Compiler.load(path, use_nep8=False, registry=registry).write()
+        self.assertEqual(nonnep8, Compiler.load(path, use_nep8=False).write())
+
+    def test_registry_changed_file(self):
+
+        registry = ModuleRegistry()
+        src_dir = tempfile.mkdtemp()
+        path = os.path.join(src_dir, 'RegistryTest.py')
+
+        try:
+            with open(path, 'w') as f:
+                f.write('def Main(a):\n    return a + 1\n')
+            first = Compiler.load(path, registry=registry).write()
+
+            with open(path, 'w') as f:
+                f.write('def Main(a):\n    return a + 2\n')
+            os.utime(path, ns=(0, 0))
+            second = Compiler.load(path, registry=registry).write()
+
+            self.assertEqual(registry.misses, 2)
+            self.assertNotEqual(first, second)
+        finally:
+            shutil.rmtree(src_dir)
+
+    def test_single_parse(self):
+
+        source = ('x = 3\n'
+                  '\n'
+                  '\n'
+                  'def Main(a):\n'
+                  '    d = {"a": a, "b": x}\n'
+                  '    return d["a"] + d["b"]\n')
+
+        compiler = Compiler.load('SingleParseTest.py', source=source)
+        method = compiler.default.main
+
+        self.assertEqual(method.start_line_no, 4)
+        self.assertEqual(method.bytecode[0].lineno, 2)
+        self.assertEqual([d.name for d in method.dictionary_defs], ['d'])
+        self.assertEqual(compiler.stats.calls['parse'], 1)
+
+    def test_registry_max_entries(self):
+
+        registry = ModuleRegistry(max_entries=2)
+
+        for name in ['A.py', 'B.py', 'A.py', 'C.py']:
+            registry.parse(name, 'def Main():\n    return 1\n')
+
+        # B was used least recently, so it made room for C
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(registry.misses, 3)
+        registry.parse('A.py', 'def Main():\n    return 1\n')
+        self.assertEqual(registry.hits, 2)
+        registry.parse('B.py', 'def Main():\n    return 1\n')
+        self.assertEqual(registry.misses, 4)
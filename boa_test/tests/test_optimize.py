@@ -0,0 +1,266 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.code.optimize import O0, O1, O2, OptimizationPass, PassManager, PeepholePass, StackLocalsPass, TokenStream, \
+    op_price
+from boa.code.vmtoken import VMToken
+from boa.compiler import Compiler
+from boa.interop import VMOp
+import json
+
+from neo.Prompt.Commands.BuildNRun import TestBuild
+
+
+class RemoveNops(OptimizationPass):
+    name = 'remove_nops'
+
+    def run(self, stream):
+        for index in reversed(range(len(stream.tokens))):
+            if stream.tokens[index].vm_op == VMOp.NOP:
+                stream.remove(index)
+
+
+class UnscannedTargets(dict):
+    """
+    The targets of a ``TokenStream`` that fail any pass going through every branch.
+    """
+
+    def __iter__(self):
+        raise AssertionError('the branches of the method were scanned')
+
+    def items(self):
+        raise AssertionError('the branches of the method were scanned')
+
+    def values(self):
+        raise AssertionError('the branches of the method were scanned')
+
+    def keys(self):
+        raise AssertionError('the branches of the method were scanned')
+
+
+class TestContract(BoaTest):
+
+    def test_op_price(self):
+
+        self.assertEqual(op_price(ord(VMOp.PUSH1)), 0)
+        self.assertEqual(op_price(ord(VMOp.NOP)), 0)
+        self.assertEqual(op_price(ord(VMOp.ADD)), 1)
+        self.assertEqual(op_price(ord(VMOp.APPCALL)), 10)
+        self.assertEqual(op_price(ord(VMOp.CHECKSIG)), 100)
+
+    def test_levels(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+
+        for level in [O0, O2]:
+            compiler = Compiler.load(path, optimize=level)
+            compiler.write()
+            self.assertEqual(compiler.context.optimize, level)
+            self.assertEqual(compiler.context.optimizer.level, level)
+
+        with self.assertRaises(ValueError):
+            PassManager(3)
+
+        self.assertEqual(PassManager(O0, [RemoveNops]).passes, [])
+        self.assertEqual(len(PassManager(O2, [RemoveNops]).passes), 1)
+
+    def test_custom_pass(self):
+
+        path = '%s/boa_test/example/Fibonacci.py' % TestContract.dirname
+
+        expected = Compiler.load(path, optimize=O0)
+        expected_out = expected.write()
+
+        compiler = Compiler.load(path)
+        compiler.context.optimizer = PassManager(passes=[RemoveNops])
+        out = compiler.write()
+
+        nops = [vmtoken for m in expected.default.orderered_methods for vmtoken in m.vm_tokens.values()
+                if vmtoken.vm_op == VMOp.NOP]
+        self.assertGreater(len(nops), 0)
+        self.assertEqual(len(out), len(expected_out) - len(nops))
+
+        saved = compiler.stats.optimizations['remove_nops']
+        self.assertEqual(saved['bytes'], len(nops))
+        self.assertEqual(saved['gas'], 0)
+        self.assertEqual(json.loads(compiler.stats.to_json())['optimizations']['remove_nops']['bytes'], len(nops))
+
+        for m in compiler.default.orderered_methods:
+            for vmtoken in m.vm_tokens.values():
+                self.assertNotEqual(vmtoken.vm_op, VMOp.NOP)
+
+        # every remaining token is still attributed to its line
+        debug_map = json.loads(compiler.default.generate_debug_json('Fibonacci', 'md5'))
+        expected_map = json.loads(expected.default.generate_debug_json('Fibonacci', 'md5'))
+        self.assertEqual(sorted(set(entry['line'] for entry in debug_map['map'])),
+                         sorted(set(entry['line'] for entry in expected_map['map'])))
+
+        for argument, result in [(4, 3), (5, 5), (6, 8)]:
+            tx, results, total_ops, engine = TestBuild(out, [argument], self.GetWallet1(), '02', '02')
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].GetBigInteger(), result)
+
+    def test_token_stream(self):
+
+        compiler = Compiler.load('%s/boa_test/example/WhileTest.py' % TestContract.dirname, optimize=O0)
+        compiler.write()
+        method = compiler.default.main
+
+        stream = TokenStream(method)
+        self.assertTrue(stream.valid)
+        self.assertEqual(stream.size, sum(1 + len(t.data) if t.data is not None and t.vm_op != VMOp.NOP else 1
+                                          for t in stream.tokens))
+        self.assertGreater(len(stream.targets), 0)
+
+        # a branch to a removed token jumps to the token after it
+        branch, target = next((b, t) for b, t in stream.targets.items() if t is not TokenStream.END)
+        index = stream.tokens.index(target)
+        following = stream.tokens[index + 1]
+        stream.remove(index)
+        stream.commit()
+
+        self.assertIs(stream.targets[branch], following)
+        self.assertEqual(branch.addr + int.from_bytes(branch.data, 'little', signed=True), following.addr)
+        self.assertEqual(list(method.vm_tokens.values()), stream.tokens)
+
+    def test_token_stream_labels(self):
+
+        compiler = Compiler.load('%s/boa_test/example/WhileTest.py' % TestContract.dirname, optimize=O0)
+        method = compiler.default.main
+        method.prepare()
+
+        stream = TokenStream(method)
+        branch = next(b for b, t in stream.targets.items()
+                      if b.out_op == ord(VMOp.JMP) and t is not TokenStream.END and t.pytoken.jump_from_addr == b.addr)
+        label = stream.target(branch)
+
+        # move the branch away from its label
+        index = stream.tokens.index(branch)
+        stream.replace(index, index, [VMToken(VMOp.NOP)])
+        stream.commit()
+
+        self.assertEqual(label.pytoken.jump_from_addr, branch.addr)
+        self.assertEqual(branch.pytoken.jump_to_addr, label.addr)
+
+        # the branches jumping to each token are kept up to date as tokens are removed
+        for index in reversed(range(0, len(stream.tokens), 3)):
+            if stream.tokens[index].target_method is None:
+                stream.remove(index)
+            for vmtoken in stream.tokens:
+                self.assertEqual(stream.is_target(vmtoken), any(stream.target(b) is vmtoken for b in stream.targets))
+
+    def test_peephole(self):
+
+        path = '%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname
+
+        expected = Compiler.load(path, optimize=O0)
+        expected_out = expected.write()
+
+        compiler = Compiler.load(path)
+        out = compiler.write()
+
+        saved = compiler.stats.optimizations['peephole']
+        self.assertGreater(saved['bytes'], 0)
+        self.assertEqual(len(out), len(expected_out) - saved['bytes'])
+        self.assertEqual(compiler.stats.counters['bytes'], len(out))
+
+        tokens = list(compiler.default.all_vm_tokens.values())
+        for vmtoken, following in zip(tokens, tokens[1:]):
+            if vmtoken.vm_op == VMOp.SYSCALL:
+                self.assertNotEqual(following.vm_op, VMOp.NOP)
+
+        self.assertEqual(PassManager(O0).passes, [])
+
+    def test_peephole_pairs(self):
+
+        peephole = PeepholePass()
+
+        self.assertTrue(peephole.is_pair(VMToken(VMOp.SWAP), VMToken(VMOp.SWAP)))
+        self.assertTrue(peephole.is_pair(VMToken(VMOp.DUP), VMToken(VMOp.DROP)))
+        self.assertTrue(peephole.is_pair(VMToken(VMOp.PUSH5), VMToken(VMOp.DROP)))
+        self.assertTrue(peephole.is_pair(VMToken(VMOp.PUSHBYTES1, data=b'\x07'), VMToken(VMOp.DROP)))
+        self.assertFalse(peephole.is_pair(VMToken(VMOp.DROP), VMToken(VMOp.DUP)))
+        self.assertFalse(peephole.is_pair(VMToken(VMOp.ADD), VMToken(VMOp.DROP)))
+
+    def test_peephole_breakpoints(self):
+
+        path = '%s/boa_test/example/BreakpointTest.py' % TestContract.dirname
+
+        expected = json.loads(Compiler.load(path, optimize=O0).default.generate_debug_json('BreakpointTest', 'md5'))
+        result = json.loads(Compiler.load(path).default.generate_debug_json('BreakpointTest', 'md5'))
+
+        self.assertEqual(len(result['breakpoints']), len(expected['breakpoints']))
+        self.assertEqual(sorted(set(entry['line'] for entry in result['map'])),
+                         sorted(set(entry['line'] for entry in expected['map'])))
+
+        for argument, value in [(1, True), (3, True), (4, False)]:
+            out = Compiler.load(path).default.write()
+            tx, results, total_ops, engine = TestBuild(out, [argument], self.GetWallet1(), '02', '01')
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0].GetBoolean(), value)
+
+    def test_stack_locals(self):
+
+        source = ('def Main(a, b):\n'
+                  '    unused = a * 2\n'
+                  '    total = 0\n'
+                  '    i = 0\n'
+                  '    while i < a:\n'
+                  '        step = i + b\n'
+                  '        total = total + step\n'
+                  '        i = i + 1\n'
+                  '    result = total + helper(a)\n'
+                  '    return result\n'
+                  '\n'
+                  '\n'
+                  'def helper(n):\n'
+                  '    doubled = n * 2\n'
+                  '    return doubled\n')
+
+        expected = Compiler.compile_source(source, 'StackLocalsTest.py', optimize=O1)
+        result = Compiler.compile_source(source, 'StackLocalsTest.py', optimize=O2)
+
+        self.assertTrue(result.success, result.error)
+        self.assertLess(len(result.data), len(expected.data))
+        saved = result.stats.optimizations['stack_locals']
+        self.assertGreater(saved['bytes'], 0)
+        self.assertGreater(saved['gas'], 0)
+
+        for arguments, value in [([3, 4], 21), ([0, 4], 0), ([5, 1], 25)]:
+            for out in [expected.data, result.data]:
+                tx, results, total_ops, engine = TestBuild(out, list(arguments), self.GetWallet1(), '0202', '02')
+                self.assertEqual(len(results), 1)
+                self.assertEqual(results[0].GetBigInteger(), value)
+
+    def test_stack_locals_accesses(self):
+
+        compiler = Compiler.load('%s/boa_test/example/Fibonacci.py' % TestContract.dirname, optimize=O0)
+        compiler.write()
+        method = compiler.default.method_named('fibR')
+        tokens = TokenStream(method).tokens
+
+        # the argument is packed into the frame, so it is only ever loaded
+        accesses = StackLocalsPass().find_accesses(tokens)
+        self.assertGreater(len(accesses), 0)
+        self.assertFalse(any(is_store for _, is_store, _ in accesses))
+        self.assertTrue(all(slot == 0 for _, _, slot in accesses))
+
+        # a frame array used in any other way leaves the method as it is
+        self.assertIsNone(StackLocalsPass().find_accesses(tokens[:-1] + [VMToken(VMOp.DUPFROMALTSTACK)]))
+
+    def test_passes_use_branch_index(self):
+
+        compiler = Compiler.load('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname, optimize=O0)
+        compiler.write()
+
+        for method in compiler.default.orderered_methods:
+            if method.is_interop:
+                continue
+            stream = TokenStream(method)
+            if not stream.valid:
+                continue
+
+            # the passes only look up the branches jumping to a token, however many there are
+            stream.targets = UnscannedTargets(stream.targets)
+            StackLocalsPass().run(stream)
+            PeepholePass().run(stream)
+            stream.targets = dict(dict.items(stream.targets))
+            stream.commit()
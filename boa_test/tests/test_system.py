@@ -13,16 +13,16 @@ class TestContract(BoaFixtureTest):
 
         tx, results, total_ops, engine = TestBuild(out, ['executing_sh'], self.GetWallet1(), '07', '05')
         self.assertEqual(len(results), 1)
-        self.assertEqual(results[0].GetByteArray(), bytearray(b'\x82\x13\x19\xd7\xfc\x87\xec\xa5\xae\x04\x91\xf60E\xd5\xac\x9a\x07\xe2\xb1'))
+        self.assertEqual(results[0].GetByteArray(), bytearray(b'\xa7|)_\x87\x9a\xb3eAMv\x19\xec\xa3s\xc7u&\x18\xd7'))
 
         tx, results, total_ops, engine = TestBuild(out, ['calling_sh'], self.GetWallet1(), '07', '05')
         self.assertEqual(len(results), 1)
         print("results: %s " % results[0].GetByteArray())
-        self.assertEqual(results[0].GetByteArray(), bytearray(b'\xb6\xa9\xdf\xfe\x85o\xdb<\x04\x7f\xacW\xc6\xc1)\xdb\xc5|\x12\xaa'))
+        self.assertEqual(results[0].GetByteArray(), bytearray(b'\x8c\x85\x91\xae?F\x89\xf4-U\xcd\x0c\xb8\xee\x81\x1f\xafT|\xe9'))
 
         tx, results, total_ops, engine = TestBuild(out, ['entry_sh'], self.GetWallet1(), '07', '05')
         self.assertEqual(len(results), 1)
-        self.assertEqual(results[0].GetByteArray(), bytearray(b'2\xdez&\xc4\xc2>\xcbQ0\xa3cJ\x8c\xbdjd\xe9\x8d\xed'))
+        self.assertEqual(results[0].GetByteArray(), bytearray(b'/\xa4\xb5\xba\x90E\x1f)\xde*%\xc9\xca\xed\xd0Gy\x00<\x9f'))
 
         tx, results, total_ops, engine = TestBuild(out, ['script_container'], self.GetWallet1(), '07', '05')
         self.assertEqual(len(results), 1)
@@ -0,0 +1,83 @@
+from boa_test.tests.boa_test import BoaTest
+from boa.compiler import Compiler
+from boa.watch import Watcher
+import os
+import shutil
+import tempfile
+
+
+class TestContract(BoaTest):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copy('%s/boa_test/example/demo/ICO_Template.py' % TestContract.dirname, self.directory)
+        self.path = os.path.join(self.directory, 'ICO_Template.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def edit(self, old, new, mtime):
+        with open(self.path) as f:
+            source = f.read()
+        self.assertIn(old, source)
+        with open(self.path, 'w') as f:
+            f.write(source.replace(old, new))
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def assertMatchesFullCompile(self, result):
+        expected = Compiler.load(self.path).artifacts()
+        self.assertTrue(result.success)
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(result.debug_json, expected.debug_json)
+
+    def test_watch_incremental(self):
+        watcher = Watcher(self.path)
+
+        self.assertTrue(watcher.changed())
+        result = watcher.compile()
+        self.assertMatchesFullCompile(result)
+        self.assertEqual(watcher.reused, 0)
+        self.assertFalse(watcher.changed())
+
+        with open(watcher.output_path, 'rb') as f:
+            self.assertEqual(f.read(), result.data)
+
+        # change the body of a single method
+        self.edit("return 'unknown operation'", "return 'unknown op'", 1)
+        self.assertTrue(watcher.changed())
+        result = watcher.compile()
+        self.assertMatchesFullCompile(result)
+        self.assertEqual(watcher.tokenized, 1)
+        self.assertGreater(watcher.reused, 0)
+        self.assertEqual(result.stats.counters['reused_methods'], watcher.reused)
+
+        # move every method down a few lines, only the methods of the contract file itself depend on
+        # the lines of its globals
+        self.edit('from boa.interop', '\n\n# imports\nfrom boa.interop', 2)
+        result = watcher.compile()
+        self.assertMatchesFullCompile(result)
+        own_methods = [m for m in watcher.compiler.default.methods if m.module is watcher.compiler.default]
+        self.assertEqual(watcher.tokenized, len(own_methods))
+
+    def test_watch_error(self):
+        watcher = Watcher(self.path)
+        watcher.compile()
+
+        self.edit("def Main(operation, args):", "def Main(operation, args):\n    a = {'b': {}}", 1)
+        result = watcher.compile()
+        self.assertFalse(result.success)
+        self.assertIn('dictionaries', result.error)
+        self.assertFalse(watcher.changed())
+
+        self.edit("    a = {'b': {}}\n", "", 2)
+        self.assertTrue(watcher.changed())
+        result = watcher.compile()
+        self.assertMatchesFullCompile(result)
+
+    def test_watch(self):
+        results = []
+        watcher = Watcher(self.path, use_nep8=False)
+        watcher.watch(results.append, poll_interval=0, max_compiles=1)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].data, Compiler.load(self.path, use_nep8=False).write())
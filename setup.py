@@ -74,7 +74,6 @@ setup(
 
     install_requires=[
         'coz-bytecode==0.5.1',
-        'astor'
     ],
 
     python_requires='>=3.6',
@@ -104,9 +103,10 @@ setup(
     # To provide executable scripts, use entry points in preference to the
     # "scripts" keyword. Entry points provide cross-platform support and allow
     # pip to create the appropriate form of executable for the target platform.
-    #entry_points={
-    #    'console_scripts': [
-    #        'sample=sample:main',
-    #    ],
-    #},
+    entry_points={
+        'console_scripts': [
+            'boa-daemon=boa.daemon:main',
+            'boa-watch=boa.watch:main',
+        ],
+    },
 )